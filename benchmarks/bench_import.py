@@ -0,0 +1,70 @@
+"""
+Import-time regression benchmark for the sandwich CLI.
+
+Runs a pure-sort CLI invocation (no fetching) in a fresh interpreter with
+`python -X importtime`. It fails if ccxt, requests or aiohttp get imported, or if the
+cumulative import time of the sandwich package exceeds the budget.
+
+Usage:
+    python benchmarks/bench_import.py [--budget-ms 250] [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HEAVY_MODULES = ('ccxt', 'requests', 'aiohttp')
+
+SCRIPT = "import sandwich; sandwich.app(['--base', 'usdtperp'], standalone_mode=False)"
+
+
+def parse_importtime(stderr):
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def run_once(workdir):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', SCRIPT],
+                            cwd=workdir, capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--budget-ms', type=float, default=250.0)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'marketcap.json'), 'w') as f:
+            json.dump([{'symbol': 'btc', 'total_volume': 1}], f)
+        with open(os.path.join(tmp, 'usdt_swap_pairs.txt'), 'w') as f:
+            f.write('BINANCE:BTCUSDTPERP\n')
+
+        timings = []
+        for _ in range(args.runs):
+            modules = run_once(tmp)
+            heavy = [name for name in modules if name.split('.')[0] in HEAVY_MODULES]
+            if heavy:
+                sys.exit(f'FAIL: pure-sort run imported heavy modules: {", ".join(sorted(set(heavy)))}')
+            timings.append(modules['sandwich'] / 1000)
+
+    median = statistics.median(timings)
+    print(f'sandwich cumulative import time: median {median:.1f}ms, min {min(timings):.1f}ms ({args.runs} runs)')
+    if median > args.budget_ms:
+        sys.exit(f'FAIL: import time {median:.1f}ms exceeds budget of {args.budget_ms:.0f}ms')
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
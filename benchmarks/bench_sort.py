@@ -0,0 +1,108 @@
+"""
+Benchmark for sort_market_data symbol matching on synthetic pair lists.
+
+Usage:
+    python benchmarks/bench_sort.py [--lines 10000] [--coins 500]
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+import tempfile
+import time
+
+from sandwich.process import remove_prefix_suffix, sort_market_data
+
+
+def linear_find_symbol_in_lines(item, lines, base_currency='USDT'):
+    # The original O(lines) scan, kept here as the reference implementation
+    excluded_currencies = ['USDC', 'FDUSD', 'EUR']
+    for line in lines:
+        symbol = item["symbol"].upper() + base_currency
+        symbol_in_line = remove_prefix_suffix(line)
+        if not any(symbol == f'{curr}{base_currency}' for curr in excluded_currencies) and (symbol == symbol_in_line or ('1000' + symbol) == symbol_in_line):
+            return line
+    return ''
+
+
+def linear_sort(mcap, lines, base_currency):
+    mcap_sorted = sorted(mcap[0:500], key=lambda x: x["total_volume"], reverse=True)
+    sorted_lines = []
+    sorted_symbols = set()
+    for i in mcap_sorted:
+        line = linear_find_symbol_in_lines(i, lines, base_currency)
+        # a line is ranked once, by the first coin matching it
+        if line and line not in sorted_symbols:
+            sorted_lines.append(line)
+            sorted_symbols.add(line)
+    sorted_lines.extend(line for line in lines if line not in sorted_symbols)
+    return ''.join(line + '\n' for line in sorted_lines)
+
+
+def make_coins(n, rng):
+    coins = set()
+    while len(coins) < n:
+        coins.add(''.join(rng.choices(string.ascii_uppercase, k=rng.randint(2, 6))))
+    return sorted(coins)
+
+
+def make_fixtures(n_lines, n_coins, seed=42):
+    rng = random.Random(seed)
+    coins = make_coins(n_lines, rng)
+    lines = []
+    for coin in coins:
+        prefix = '1000' if rng.random() < 0.05 else ''
+        lines.append(f'BINANCE:{prefix}{coin}USDTPERP')
+    rng.shuffle(lines)
+    mcap = [
+        {
+            'symbol': rng.choice(coins).lower(),
+            'total_volume': rng.randint(0, 10 ** 10),
+            'market_cap_rank': rank,
+        }
+        for rank in range(1, n_coins + 1)
+    ]
+    return mcap, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=10000)
+    parser.add_argument('--coins', type=int, default=500)
+    args = parser.parse_args()
+
+    mcap, lines = make_fixtures(args.lines, args.coins)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            with open('marketcap.json', 'w') as f:
+                json.dump(mcap, f)
+            with open('usdt_swap_pairs.txt', 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+
+            start = time.perf_counter()
+            expected = linear_sort(mcap, lines, 'USDT')
+            linear_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            sort_market_data('USDT', 'swap')
+            indexed_time = time.perf_counter() - start
+
+            with open('sorted_usdt_swap.txt') as f:
+                actual = f.read()
+        finally:
+            os.chdir(cwd)
+
+    assert actual == expected, 'indexed output differs from linear scan'
+    print(f'lines={args.lines} coins={args.coins}')
+    print(f'linear scan:   {linear_time:.3f}s')
+    print(f'indexed sort:  {indexed_time:.3f}s')
+    print(f'speedup:       {linear_time / indexed_time:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
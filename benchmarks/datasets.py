@@ -0,0 +1,82 @@
+"""
+Recorded fixtures for the benchmarks, scalable to synthetic sizes.
+
+benchmarks/fixtures/ mirrors the market cache layout (markets/<exchange>.json)
+plus a CoinGecko marketcap.json, so the same files can be used with
+SANDWICH_CACHE_DIR=benchmarks/fixtures.
+"""
+
+import json
+import os
+import random
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_markets(exchange_id):
+    with open(os.path.join(FIXTURES_DIR, 'markets', f'{exchange_id}.json')) as f:
+        return json.load(f)['markets']
+
+
+def load_marketcap():
+    with open(os.path.join(FIXTURES_DIR, 'marketcap.json')) as f:
+        return json.load(f)
+
+
+def synthetic_coin(i):
+    # Letters only, so synthetic coins never collide with the k/1000 prefixes
+    name = ''
+    i += 26 * 26
+    while i:
+        i, r = divmod(i, 26)
+        name = chr(ord('A') + r) + name
+    return 'Z' + name
+
+
+def scale_markets(markets, size, seed=0):
+    """
+    Pads a recorded market map with synthetic markets of the same shape up to `size` markets.
+    Each synthetic coin is added for every (quote, type) template found in the recording.
+    """
+    rng = random.Random(seed)
+    scaled = dict(markets)
+    templates = list({(m['quote'], m['type']): m for m in markets.values()}.values())
+    i = 0
+    while len(scaled) < size:
+        coin = synthetic_coin(i)
+        i += 1
+        for template in templates:
+            settle = template.get('settle')
+            symbol = f"{coin}/{template['quote']}" + (f':{settle}' if settle else '')
+            market = dict(template, symbol=symbol, base=coin, id=coin + template['quote'],
+                          active=rng.random() > 0.02)
+            scaled[symbol] = market
+    return scaled
+
+
+def scale_marketcap(marketcap, size, seed=0):
+    """
+    Pads a recorded CoinGecko dump with synthetic coins up to `size` items,
+    reusing the synthetic coin names produced by scale_markets.
+    """
+    rng = random.Random(seed)
+    scaled = list(marketcap)
+    i = 0
+    while len(scaled) < size:
+        coin = synthetic_coin(i)
+        i += 1
+        volume = rng.lognormvariate(17, 2)
+        scaled.append(dict(marketcap[-1], id=coin.lower(), symbol=coin.lower(), name=coin,
+                           market_cap_rank=len(scaled) + 1, total_volume=volume,
+                           market_cap=volume * rng.uniform(1, 50)))
+    return scaled
+
+
+def pairs_from_markets(markets, quote, market_type):
+    return [symbol for symbol, market in markets.items()
+            if market['active'] and market['quote'] == quote and market.get(market_type, False)]
+
+
+def tradingview_lines(pairs, exchange='BINANCE', market_type='swap'):
+    type_str = 'PERP' if market_type == 'swap' else ''
+    return [f"{exchange}:{pair.split(':')[0].replace('/', '')}{type_str}" for pair in pairs]
@@ -0,0 +1,176 @@
+"""
+Benchmark harness for the fetch -> match -> sort pipeline hot paths.
+
+Every stage runs offline against the recorded fixtures in benchmarks/fixtures,
+padded with synthetic markets and coins to the requested size. Results are
+written as JSON so runs on different branches can be compared.
+
+Usage:
+    python benchmarks/run.py --size 20000 --output results.json
+    python benchmarks/run.py --size 20000 --compare results.json --threshold 1.25
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datasets
+from sandwich.binance import pairs as binance_pairs
+from sandwich.hyperliquid import pairs as hyperliquid_pairs
+from sandwich.process import find_symbol_in_lines, load_market_data, sort_market_data
+from sandwich.ranking import Ranking
+
+
+def measure(fn, setup=None, repeat=5):
+    """Runs fn `repeat` times with stdout silenced and returns the timings in seconds."""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def remove(*paths):
+    def setup():
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+    return setup
+
+
+def build_stages(size):
+    binance_markets = datasets.scale_markets(datasets.load_markets('binance'), size)
+    hyperliquid_markets = datasets.scale_markets(datasets.load_markets('hyperliquid'), size // 4, seed=1)
+    bybit_markets = datasets.scale_markets(datasets.load_markets('bybit'), size // 2, seed=2)
+    marketcap = datasets.scale_marketcap(datasets.load_marketcap(), size)
+
+    usdt_swap = datasets.pairs_from_markets(binance_markets, 'USDT', 'swap')
+    hl_pairs = datasets.pairs_from_markets(hyperliquid_markets, 'USDC', 'swap')
+    lines = datasets.tradingview_lines(usdt_swap)
+
+    # Files the pipeline expects in the working directory
+    with open('marketcap.json', 'w') as f:
+        json.dump(marketcap, f)
+    with open('usdt_swap_pairs.txt', 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    mcap = load_market_data(limit=None)
+    item = mcap[len(mcap) // 2]
+    ranking = Ranking(mcap)
+    ranking.order_lines(lines, 'USDT')
+
+    stages = {
+        'load_market_data': (lambda: load_market_data(limit=None), None),
+        'find_symbol_in_lines': (lambda: find_symbol_in_lines(item, lines, 'USDT'), None),
+        'sort_market_data': (lambda: sort_market_data('USDT', 'swap', mcap=mcap),
+                             remove('sorted_usdt_swap.txt', '.sandwich_manifest.json')),
+        'ranking.build': (lambda: Ranking(mcap), None),
+        'ranking.build_blend': (lambda: Ranking(mcap, 'blend'), None),
+        'ranking.order_lines': (lambda: ranking.order_lines(lines, 'USDT'), None),
+        'sort_market_data.ranking': (lambda: sort_market_data('USDT', 'swap', ranking=ranking),
+                                     remove('sorted_usdt_swap.txt', '.sandwich_manifest.json')),
+        'load_pairs_from_file': (lambda: hyperliquid_pairs.load_pairs_from_file('USDT', 'swap'), None),
+        'match_with_binance_pairs': (lambda: hyperliquid_pairs.match_with_binance_pairs(hl_pairs, 'USDT', 'swap'), None),
+        'match_pairs_between_exchanges': (
+            lambda: hyperliquid_pairs.match_pairs_between_exchanges(
+                datasets.pairs_from_markets(bybit_markets, 'USDT', 'swap'), 'binance', 'USDT', 'swap',
+                target_markets=binance_markets), None),
+        'binance.save_pairs_for_tradingview': (
+            lambda: binance_pairs.save_pairs_for_tradingview(usdt_swap, 'USDT', 'swap', 'bench_binance.txt'),
+            remove('bench_binance.txt', '.sandwich_manifest.json')),
+        'hyperliquid.save_pairs_for_tradingview': (
+            lambda: hyperliquid_pairs.save_pairs_for_tradingview(usdt_swap, 'bybit', 'USDT', 'swap', 'bench_bybit.txt'),
+            remove('bench_bybit.txt', '.sandwich_manifest.json')),
+        'save_hyperliquid_pairs_for_tradingview': (
+            lambda: hyperliquid_pairs.save_hyperliquid_pairs_for_tradingview(usdt_swap, 'USDT', 'swap'),
+            remove('usdt_swap_hype_pairs.txt', '.sandwich_manifest.json')),
+    }
+    counts = {'markets': len(binance_markets), 'lines': len(lines), 'coins': len(marketcap),
+              'hyperliquid_pairs': len(hl_pairs)}
+    return stages, counts
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_file, threshold):
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    regressions = []
+    print(f"\n{'stage':<42} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, result in results['stages'].items():
+        base = baseline['stages'].get(name)
+        if not base:
+            continue
+        # the fastest run is the least noisy estimate of the cost of a stage
+        ratio = result['min'] / base['min'] if base['min'] else float('inf')
+        flag = '  REGRESSION' if ratio > threshold else ''
+        print(f"{name:<42} {base['min'] * 1000:>8.2f}ms {result['min'] * 1000:>8.2f}ms {ratio:>6.2f}x{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=10000, help='synthetic number of markets and coins')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--stages', nargs='+', help='only run these stages')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            stages, counts = build_stages(args.size)
+            results = {
+                'meta': {'revision': git_revision(), 'python': platform.python_version(),
+                         'size': args.size, 'repeat': args.repeat, 'counts': counts, 'timestamp': time.time()},
+                'stages': {},
+            }
+            print(f"{'stage':<42} {'median':>10} {'min':>10}")
+            for name, (fn, setup) in stages.items():
+                if args.stages and name not in args.stages:
+                    continue
+                timings = measure(fn, setup, args.repeat)
+                results['stages'][name] = {'median': statistics.median(timings), 'min': min(timings),
+                                           'timings': timings}
+                print(f"{name:<42} {statistics.median(timings) * 1000:>8.2f}ms {min(timings) * 1000:>8.2f}ms")
+        finally:
+            os.chdir(cwd)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            sys.exit(f"\nRegressions over {args.threshold}x: {', '.join(regressions)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,36 +1,327 @@
+import contextlib
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import typer
-from .coingecko.markets import save_market_data
+from . import aliases, cache, httpclient, metrics, outputs
+from .binance import pairs as binance_pairs
 from .binance.pairs import get_and_save_pairs
+from .hyperliquid import pairs as hyperliquid_pairs
 from .hyperliquid.pairs import get_and_save_hyperliquid_pairs
-from .process import sort_market_data
+from .process import load_market_data, sort_market_data
 
 app = typer.Typer()
 
-@app.command()
-def main(base: str = 'usdtperp', fetch: bool = False, get_pairs: bool = False, hyperliquid: bool = False):
+def __getattr__(name):
+    # the HTTP client is only opened when CoinGecko data is actually fetched
+    if name == 'save_market_data':
+        from .coingecko.markets import save_market_data
+        return save_market_data
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def parse_base(base):
+    """
+    Splits a base option such as 'usdtperp' or 'usdc' into currency and market type.
+
+    Args:
+        base (str): The base currency/type, with a 'perp' suffix for perpetual markets.
+
+    Returns:
+        tuple: The upper-cased base currency and the market type ('swap' or 'spot').
+    """
     if base.lower().endswith('perp'):
-        base_currency = base[:-4].upper()
-        market_type = 'swap'
+        return base[:-4].upper(), 'swap'
+    return base.upper(), 'spot'
+
+def parse_bases(bases):
+    """
+    Parses a comma-separated list of bases into unique (currency, market type) targets.
+
+    Args:
+        bases (str): The bases, e.g. 'usdtperp,usdc,fdusd'.
+
+    Returns:
+        list: The (base_currency, market_type) tuples, in order.
+    """
+    return list(dict.fromkeys(parse_base(b.strip()) for b in bases.split(',') if b.strip()))
+
+def configure_outputs(formats=None, gzip=False):
+    """
+    Sets the extra formats written next to every list from the --formats and --gzip options.
+
+    Args:
+        formats (str, optional): Comma-separated formats, e.g. 'sections,csv,json'.
+        gzip (bool): Whether to gzip the extra formats.
+
+    Raises:
+        typer.BadParameter: If a format is unknown.
+    """
+    try:
+        outputs.configure([f.strip() for f in formats.split(',') if f.strip()] if formats else (), gzip=gzip)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint='--formats')
+
+def fetch_market_data(pages=2, delta=False):
+    """
+    Downloads CoinGecko market data, refreshing only the volumes of known coins with delta.
+    """
+    from .coingecko import markets
+    if delta:
+        markets.refresh_market_data(pages=pages)
     else:
-        base_currency = base.upper()
-        market_type = 'spot'
+        markets.save_market_data(pages=pages)
+
+def install_aliases():
+    """
+    Installs the alias table built from the cached markets and marketcap.json (rebuilt only when they changed).
+    """
+    aliases.install(aliases.load_alias_table())
 
-    if fetch:
-        save_market_data()
+def fetch_in_background(pages=2, delta=False):
+    """
+    Starts fetch_market_data in a worker thread so the download overlaps loading the exchange markets.
+
+    Returns:
+        concurrent.futures.Future: The download; call result() before reading the market data.
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    download = executor.submit(fetch_market_data, pages, delta)
+    executor.shutdown(wait=False)
+    return download
+
+def run(targets, fetch=False, get_pairs=False, hyperliquid=False, pages=2, exchanges=None, limit=500, top_k=None, db=None,
+        delta=False, sort_key='volume', weights=None, workers=1):
+    """
+    Runs the fetch, match and sort pipeline for every (base_currency, market_type) target.
+    With db, snapshots and pair lists are stored in that SQLite database and sorted there.
+    With workers > 1, the sorted lists are written by a pool of worker processes.
+
+    Returns:
+        dict: Exchange ID to the error, for the --exchanges whose markets failed to load.
+    """
+    if db:
+        from . import store
+        with contextlib.closing(store.connect(db)) as conn:
+            return run_with_store(conn, targets, fetch, get_pairs, hyperliquid, pages, exchanges, limit, top_k, delta)
+
+    failures = {}
+    download = fetch_in_background(pages, delta) if fetch else None
+    install_aliases()
 
     if get_pairs and not hyperliquid:
-        get_and_save_pairs(base_currency, market_type)
+        # Load Binance markets once and share them across every base
+        markets = binance_pairs.load_markets()
+        for base_currency, market_type in targets:
+            get_and_save_pairs(base_currency, market_type, markets)
+
+    if exchanges:
+        # Load every exchange concurrently, then match and write from memory
+        exchange_ids = [e.strip().lower() for e in exchanges.split(',') if e.strip()]
+        markets_by_exchange, _, failures = hyperliquid_pairs.load_markets_concurrently(exchange_ids)
+        for base_currency, market_type in targets:
+            hyperliquid_pairs.get_and_save_multi_exchange_pairs(exchange_ids, base_currency, market_type,
+                                                                markets_by_exchange=markets_by_exchange)
+
+    if download:
+        download.result()
+    # pick up the new market data and markets
+    install_aliases()
 
+    from .ranking import EXCHANGE_SORT_KEYS, Ranking, load_ticker_ranking
+    market_types = dict.fromkeys(market_type for _, market_type in targets)
+    if sort_key in EXCHANGE_SORT_KEYS:
+        # Rank by Binance's own tickers, one bulk request per market type
+        rankings = {market_type: load_ticker_ranking('binance', market_type, sort_key) for market_type in market_types}
+    else:
+        # Parse and rank the market data once and share it across every sort
+        ranking = Ranking(load_market_data(limit=limit, top_k=top_k), sort_key, weights)
+        rankings = dict.fromkeys(market_types, ranking)
+
+    jobs = []
     if hyperliquid:
-        get_and_save_hyperliquid_pairs(base_currency, 'USDT', market_type)
-        # If we've fetched hyperliquid pairs, sort them as well
-        sort_market_data('USDT', market_type, is_hyperliquid=True)
+        markets = hyperliquid_pairs.load_markets()
+        for base_currency, market_type in targets:
+            get_and_save_hyperliquid_pairs(base_currency, 'USDT', market_type, markets)
+            # If we've fetched hyperliquid pairs, sort them as well
+            jobs.append(('USDT', market_type, True))
 
     # Sort the regular pairs (if hyperliquid wasn't specified)
     if not hyperliquid or get_pairs:
-        sort_market_data(base_currency, market_type)
+        jobs += [(base_currency, market_type, False) for base_currency, market_type in targets]
+
+    # Every list is independent; with workers > 1 they are sorted in a process pool
+    from .scheduler import run_sorts
+    run_sorts(jobs, rankings, workers)
+    return failures
+
+def run_with_store(conn, targets, fetch=False, get_pairs=False, hyperliquid=False, pages=2, exchanges=None, limit=500, top_k=None,
+                   delta=False):
+    """
+    Runs the pipeline against a SQLite store: the market data is parsed only when
+    a new snapshot is stored, and the sorted files are exported from the database.
+
+    Returns:
+        dict: Exchange ID to the error, for the --exchanges whose markets failed to load.
+    """
+    from . import store
+    from .process import list_file_names
+
+    failures = {}
+    download = fetch_in_background(pages, delta) if fetch else None
+    install_aliases()
+    store.sync_aliases(conn)
+
+    if get_pairs and not hyperliquid:
+        markets = binance_pairs.load_markets()
+        for base_currency, market_type in targets:
+            get_and_save_pairs(base_currency, market_type, markets)
+
+    if exchanges:
+        exchange_ids = [e.strip().lower() for e in exchanges.split(',') if e.strip()]
+        markets_by_exchange, _, failures = hyperliquid_pairs.load_markets_concurrently(exchange_ids)
+        for base_currency, market_type in targets:
+            hyperliquid_pairs.get_and_save_multi_exchange_pairs(exchange_ids, base_currency, market_type,
+                                                                markets_by_exchange=markets_by_exchange)
+
+    if download:
+        download.result()
+    install_aliases()
+    store.sync_aliases(conn)
+    if fetch or store.latest_snapshot(conn) is None:
+        store.save_snapshot(conn, load_market_data(limit=None))
+
+    if hyperliquid:
+        markets = hyperliquid_pairs.load_markets()
+        for base_currency, market_type in targets:
+            # matched in the database against the stored Binance list, when its file exists
+            hl_pairs = hyperliquid_pairs.get_pairs(base_currency, market_type, markets)
+            if store.match_hyperliquid_pairs(conn, hl_pairs, base_currency, 'USDT', market_type) is None:
+                get_and_save_hyperliquid_pairs(base_currency, 'USDT', market_type, markets)
+            txt_file, _ = list_file_names('USDT', market_type, is_hyperliquid=True)
+            store.import_pairs_file(conn, txt_file, 'USDT', market_type)
+            store.export_sorted(conn, 'USDT', market_type, is_hyperliquid=True, limit=limit, top_k=top_k)
+
+    if not hyperliquid or get_pairs:
+        for base_currency, market_type in targets:
+            txt_file, _ = list_file_names(base_currency, market_type)
+            store.import_pairs_file(conn, txt_file, base_currency, market_type)
+            store.export_sorted(conn, base_currency, market_type, limit=limit, top_k=top_k)
+    return failures
+
+@app.callback(invoke_without_command=True)
+def main(ctx: typer.Context, base: str = 'usdtperp', bases: str = None, fetch: bool = False, get_pairs: bool = False,
+         hyperliquid: bool = False, refresh_markets: bool = False, markets_ttl: int = cache.DEFAULT_TTL, pages: int = 2,
+         exchanges: str = None, limit: int = 500, top_k: int = None,
+         metrics_file: str = typer.Option(None, '--metrics'), quiet: bool = False, db: str = None,
+         delta: bool = False, sort_key: str = 'volume', weights: str = None,
+         tickers_ttl: int = cache.DEFAULT_TICKERS_TTL, http2: bool = False, http_timeout: float = 30,
+         workers: int = 1, formats: str = None, gzip: bool = False, http_cache: bool = True, offline: bool = False,
+         stale_if_error: float = 0):
+    if ctx.invoked_subcommand is not None:
+        return
+
+    from .ranking import EXCHANGE_SORT_KEYS, SORT_KEYS, parse_weights
+    if sort_key not in SORT_KEYS + EXCHANGE_SORT_KEYS:
+        raise typer.BadParameter(f"must be one of {', '.join(SORT_KEYS + EXCHANGE_SORT_KEYS)}", param_hint='--sort-key')
+    if db and sort_key != 'volume':
+        raise typer.BadParameter("only 'volume' is supported with --db", param_hint='--sort-key')
+    try:
+        blend_weights = parse_weights(weights) if weights else None
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint='--weights')
+    configure_outputs(formats, gzip)
+
+    cache.configure(ttl=markets_ttl, refresh=refresh_markets, tickers_ttl=tickers_ttl)
+    httpclient.configure(http2=http2, timeout=http_timeout, cache=http_cache, offline=offline,
+                         stale_if_error=stale_if_error)
+
+    # --bases usdtperp,usdc,fdusd processes every list in one run
+    base_list = [b.strip() for b in bases.split(',') if b.strip()] if bases else [base]
+    targets = parse_bases(','.join(base_list))
+
+    started = time.time()
+    # --quiet silences the progress output; errors still go to stderr
+    output = open(os.devnull, 'w') if quiet else sys.stdout
+    try:
+        with contextlib.redirect_stdout(output):
+            with metrics.span('run'):
+                failures = run(targets, fetch, get_pairs, hyperliquid, pages, exchanges, limit or None, top_k, db,
+                               delta, sort_key, blend_weights, workers)
+            print(f"Completed: {', '.join(base_list)} Fetch: {fetch} Get Pairs: {get_pairs} Hyperliquid: {hyperliquid}")
+    finally:
+        if metrics_file:
+            metrics.write(metrics_file, started)
+        if quiet:
+            output.close()
+
+    if failures:
+        # the other exchanges were still written; the exit status tells a scheduler the run is incomplete
+        for exchange_id, error in failures.items():
+            print(f"Failed to load {exchange_id} markets: {error}", file=sys.stderr)
+        raise typer.Exit(code=1)
+
+@app.command()
+def serve(bases: str = 'usdtperp', hyperliquid: bool = False, fetch: bool = True, get_pairs: bool = True, pages: int = 2,
+          limit: int = 500, top_k: int = None, host: str = '127.0.0.1', port: int = 8765,
+          markets_interval: int = 3600, marketcap_interval: int = 900, jitter: float = 0.1,
+          markets_ttl: int = cache.DEFAULT_TTL, delta: bool = False, http2: bool = False, http_timeout: float = 30,
+          formats: str = None, gzip: bool = False, http_cache: bool = True, offline: bool = False,
+          stale_if_error: float = 0):
+    """
+    Keeps exchange clients and market data in memory, refreshes them on a schedule
+    and serves the sorted lists over HTTP (GET /sorted_usdt_swap).
+    """
+    from .serve import ListService, serve as serve_lists
+
+    configure_outputs(formats, gzip)
+    cache.configure(ttl=markets_ttl)
+    httpclient.configure(http2=http2, timeout=http_timeout, cache=http_cache, offline=offline,
+                         stale_if_error=stale_if_error)
+    service = ListService(parse_bases(bases), hyperliquid, fetch, get_pairs, pages, limit or None, top_k, delta)
+    serve_lists(service, host, port, markets_interval, marketcap_interval, jitter)
+
+@app.command()
+def stream(bases: str = 'usdtperp', hyperliquid: bool = False, top: int = 50, replay: str = None, record: str = None,
+           speed: float = None, seed: bool = True, tickers_ttl: int = cache.DEFAULT_TICKERS_TTL,
+           formats: str = None, gzip: bool = False):
+    """
+    Keeps the sorted lists ordered by Binance's live 24h volumes (WebSocket ticker stream)
+    and rewrites a list only when the order of its top lines changes.
+    """
+    from .stream import stream as stream_lists
+
+    configure_outputs(formats, gzip)
+    cache.configure(tickers_ttl=tickers_ttl)
+    stream_lists(parse_bases(bases), hyperliquid, top, replay, record, speed, seed)
+
+@app.command()
+def export(db: str = typer.Option(..., '--db'), bases: str = 'usdtperp', hyperliquid: bool = False, snapshot: int = None,
+           limit: int = 500, top_k: int = None, formats: str = None, gzip: bool = False):
+    """
+    Exports the sorted TradingView lists from a SQLite store (--db) without fetching anything.
+    """
+    from . import store
+
+    configure_outputs(formats, gzip)
+    install_aliases()
+    with contextlib.closing(store.connect(db)) as conn:
+        for base_currency, market_type in parse_bases(bases):
+            if hyperliquid:
+                store.export_sorted(conn, 'USDT', market_type, True, snapshot, limit or None, top_k)
+            store.export_sorted(conn, base_currency, market_type, False, snapshot, limit or None, top_k)
+
+@app.command()
+def history(symbol: str, db: str = typer.Option(..., '--db'), since: float = None):
+    """
+    Prints the stored 24h volume history of a coin (e.g. sandwich history btc --db sandwich.db).
+    """
+    from . import store
 
-    print(f"Completed: {base} Fetch: {fetch} Get Pairs: {get_pairs} Hyperliquid: {hyperliquid}")
+    with contextlib.closing(store.connect(db)) as conn:
+        for taken_at, coin_id, total_volume in store.volume_history(conn, symbol, since):
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(taken_at))}\t{coin_id}\t{total_volume:.0f}")
 
 if __name__ == "__main__":
     app()
@@ -0,0 +1,243 @@
+"""
+Canonical asset resolver shared by every matching and sorting path.
+
+Exchanges and CoinGecko spell the same asset differently: multiplier prefixes
+('1000PEPE', 'kPEPE', '1000000MOG', '1MBABYDOGE'), renamed tickers ('MATIC' is
+now 'POL') and exchange ids that differ from the ccxt base. An AliasTable maps
+every spelling to one canonical coin, and records which CoinGecko coin owns a
+canonical coin when several share a symbol. Matching a pair or a coin is then a
+single dict lookup.
+
+The table is built once from the cached exchange markets and the CoinGecko
+market data, and is cached itself until one of them changes.
+"""
+
+import json
+import os
+
+from sandwich import cache, manifest, metrics
+from sandwich.fileutil import atomic_write
+
+# Multiplier prefixes, longest first so '1000000MOG' is not read as '1000' + '000MOG'
+MULTIPLIERS = ('1000000', '10000', '1000', '1M')
+
+# Tickers renamed after a token migration, old -> new. Only renames to a
+# symbol no other coin uses: the new symbol's CoinGecko owner takes the old lines
+RENAMES = {
+    'MATIC': 'POL',
+    'RNDR': 'RENDER',
+}
+
+def split_multiplier(coin):
+    """
+    Splits a multiplier prefix from a coin name.
+
+    Handles the 'k' prefix used by Hyperliquid (e.g. 'kPEPE') and the '1000',
+    '10000', '1000000' and '1M' prefixes used by Binance and Bybit (e.g. '1000PEPE',
+    '1MBABYDOGE').
+
+    Args:
+        coin (str): The coin name.
+
+    Returns:
+        tuple: The prefix ('' if there is none) and the normalized coin name.
+    """
+    if coin.startswith('k') and len(coin) > 1 and coin[1].isupper():
+        return 'k', coin[1:]
+    for prefix in MULTIPLIERS:
+        if coin.startswith(prefix) and len(coin) > len(prefix):
+            # '1M' is only read as a prefix before a name of 3+ letters (e.g. '1MBABYDOGE')
+            if prefix == '1M' and not (len(coin) >= 5 and coin[2:5].isalpha()):
+                continue
+            return prefix, coin[len(prefix):]
+    return '', coin
+
+def resolve(coin):
+    """
+    Applies the multiplier and rename rules to a coin name.
+
+    Returns:
+        str: The canonical coin (e.g., 'PEPE' for '1000PEPE', 'POL' for 'MATIC').
+    """
+    coin = split_multiplier(coin)[1]
+    return RENAMES.get(coin, coin)
+
+class AliasTable:
+    """
+    Maps coin spellings to canonical coins and canonical coins to their CoinGecko id.
+
+    Spellings that are not in the table are resolved with the rules on first
+    use and remembered, so every later lookup is a single dict access.
+
+    Args:
+        aliases (dict, optional): Spelling to canonical coin, for spellings the rules do not cover.
+        owners (dict, optional): Canonical coin to the id of the CoinGecko coin it stands for.
+        fingerprint (str): A hash of the table content, '' for the rules alone.
+    """
+
+    def __init__(self, aliases=None, owners=None, fingerprint=''):
+        self.overrides = dict(aliases or {})
+        self.aliases = dict(self.overrides)
+        self.owners = owners or {}
+        self.fingerprint = fingerprint
+        # quote -> line -> canonical coin, lists are resolved again on every sort
+        self.resolved_lines = {}
+
+    def canonical(self, coin):
+        """
+        Returns the canonical coin of a spelling (e.g., 'PEPE' for '1000PEPE' or 'kPEPE').
+        """
+        try:
+            return self.aliases[coin]
+        except KeyError:
+            canonical = self.aliases[coin] = resolve(coin)
+            return canonical
+
+    def line_coin(self, line, quote):
+        """
+        Returns the canonical coin of a TradingView line of any exchange.
+
+        Args:
+            line (str): The TradingView line (e.g., 'BINANCE:1000PEPEUSDTPERP').
+            quote (str): The quote currency of the list (e.g., 'USDT').
+
+        Returns:
+            str: The canonical coin, or None if the line is not quoted in quote.
+        """
+        symbol = line.rpartition(':')[2]
+        # perpetual suffixes: 'PERP' in the lists written here, '.P' in TradingView's own exports
+        if symbol.endswith('PERP'):
+            symbol = symbol[:-4]
+        elif symbol.endswith('.P'):
+            symbol = symbol[:-2]
+        if len(symbol) <= len(quote) or not symbol.endswith(quote):
+            return None
+        return self.canonical(symbol[:-len(quote)])
+
+    def line_coins(self, lines, quote):
+        """
+        Returns the canonical coin of every line (see line_coin), remembering them per quote currency.
+
+        Args:
+            lines (list): The TradingView lines.
+            quote (str): The quote currency of the list (e.g., 'USDT').
+
+        Returns:
+            list: The canonical coin of each line, None where the line is not quoted in quote.
+        """
+        known = self.resolved_lines.setdefault(quote, {})
+        line_coin = self.line_coin
+        return [known[line] if line in known else known.setdefault(line, line_coin(line, quote)) for line in lines]
+
+    def owns(self, coin, coin_id):
+        """
+        Checks whether a CoinGecko coin is the one a canonical coin stands for.
+
+        When several CoinGecko coins share a symbol, only the one with the best
+        market cap rank is matched to the exchange pairs.
+
+        Args:
+            coin (str): The canonical coin.
+            coin_id (str): The CoinGecko id (e.g., 'bitcoin').
+
+        Returns:
+            bool: False if another coin owns the canonical coin.
+        """
+        owner = self.owners.get(coin)
+        return owner is None or coin_id is None or owner == coin_id
+
+# The table used when none is passed explicitly, replaced by install()
+active = AliasTable()
+
+def install(table):
+    """
+    Makes a table the one used by Symbol, the matchers and the store.
+
+    Args:
+        table (AliasTable): The table returned by build_alias_table or load_alias_table.
+    """
+    global active
+    active = table
+
+def build_alias_table(markets_by_exchange=(), mcap=()):
+    """
+    Builds an alias table from exchange markets and CoinGecko market data.
+
+    Args:
+        markets_by_exchange (dict): Exchange ID to compact ccxt markets. Each market's
+                                    exchange id ('baseId') is aliased to its ccxt base.
+        mcap (list): CoinGecko market data items. The coin with the best market cap rank
+                     owns each canonical coin.
+
+    Returns:
+        AliasTable: The table.
+    """
+    aliases = {}
+    for markets in dict(markets_by_exchange).values():
+        for market in markets.values():
+            base, base_id = market.get('base'), market.get('baseId')
+            if base and base_id and base_id != base and resolve(base_id) != resolve(base):
+                aliases[base_id] = resolve(base)
+
+    owners = {}
+    ranked = sorted(enumerate(mcap), key=lambda entry: (entry[1].get('market_cap_rank') or float('inf'), entry[0]))
+    for _, item in ranked:
+        if item.get('id') and item.get('symbol'):
+            owners.setdefault(resolve(item['symbol'].upper()), item['id'])
+
+    fingerprint = manifest.fingerprint({'aliases': aliases, 'owners': owners, 'renames': RENAMES,
+                                        'multipliers': MULTIPLIERS})
+    return AliasTable(aliases, owners, fingerprint)
+
+def alias_cache_path(cache_dir=None):
+    """
+    Returns the path of the cached alias table.
+    """
+    return os.path.join(cache_dir or cache.settings['cache_dir'], 'aliases.json')
+
+def load_alias_table(json_file='marketcap.json', cache_dir=None):
+    """
+    Returns the alias table built from the cached exchange markets and the market data file.
+
+    The built table is cached and rebuilt only when a market cache or the market data changed.
+
+    Args:
+        json_file (str): The CoinGecko market data file.
+        cache_dir (str, optional): The cache directory. Defaults to the configured one.
+
+    Returns:
+        AliasTable: The table.
+    """
+    markets_dir = os.path.join(cache_dir or cache.settings['cache_dir'], 'markets')
+    exchange_ids = sorted(name[:-5] for name in os.listdir(markets_dir) if name.endswith('.json')) \
+        if os.path.isdir(markets_dir) else []
+    try:
+        stat = os.stat(json_file)
+        marketcap = [stat.st_mtime_ns, stat.st_size]
+    except OSError:
+        marketcap = None
+    markets = {exchange_id: cache.read_cache(exchange_id, cache_dir) for exchange_id in exchange_ids}
+    inputs = manifest.fingerprint({'marketcap': marketcap, 'renames': RENAMES, 'multipliers': MULTIPLIERS,
+                                   'markets': {exchange_id: fetched_at for exchange_id, (fetched_at, _) in markets.items()}})
+
+    path = alias_cache_path(cache_dir)
+    with metrics.span('load_aliases') as record:
+        try:
+            with open(path, 'r') as f:
+                cached = json.load(f)
+            if cached['inputs'] == inputs:
+                metrics.incr('aliases_cache_hits_total')
+                record['items'] = len(cached['owners'])
+                return AliasTable(cached['aliases'], cached['owners'], cached['fingerprint'])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        metrics.incr('aliases_cache_misses_total')
+        from sandwich.process import load_market_data
+        mcap = load_market_data(json_file, limit=None) if marketcap is not None else []
+        table = build_alias_table({exchange_id: data for exchange_id, (_, data) in markets.items() if data}, mcap)
+        record['items'] = len(table.owners)
+        payload = {'inputs': inputs, 'fingerprint': table.fingerprint, 'aliases': table.overrides,
+                   'owners': table.owners}
+        atomic_write(path, json.dumps(payload, separators=(',', ':')))
+        return table
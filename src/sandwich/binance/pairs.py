@@ -1,18 +1,31 @@
-import ccxt
+from sandwich import cache, outputs
+from sandwich.symbols import SymbolTable, tradingview_lines
 
-def get_pairs(base_currency: str = 'USDT', type='swap'):
+def load_markets():
+    """
+    Loads the market map from Binance using the ccxt library.
+    Results are served from the on-disk market cache while it is fresh.
+
+    Returns:
+        dict: The markets keyed by ccxt symbol, as returned by load_markets().
+    """
+    return cache.load_markets('binance')
+
+def get_pairs(base_currency: str = 'USDT', type='swap', markets=None):
     """
     Retrieves perpetual pairs for a specific base currency from Binance using the ccxt library.
 
     Args:
         base_currency (str): The base currency to filter pairs (e.g., 'USDT', 'USDC', 'FDUSD').
         type (str): The type of pairs to retrieve ('swap' for perpetual pairs or 'spot' for spot pairs).
+        markets (dict, optional): Markets already returned by load_markets().
+                                  If not provided, they are loaded from Binance.
 
     Returns:
         list: A list of perpetual pairs for the specified base currency.
     """
-    exchange = ccxt.binance()
-    markets = exchange.load_markets()
+    if markets is None:
+        markets = load_markets()
 
     pairs = [symbol for symbol, market in markets.items()
                   if market['active'] and market['quote'] == base_currency and market[type]]
@@ -24,7 +37,7 @@ def save_pairs_for_tradingview(pairs, base_currency, type = 'swap', filename=Non
     Converts pairs to a format importable in TradingView and saves them to a file.
 
     Args:
-        pairs (list): A list of trading pairs.
+        pairs (list or SymbolTable): The trading pairs.
         base_currency (str): The base currency of the pairs.
         filename (str, optional): The name of the file to save the pairs to.
                                   If not provided, it defaults to "{base_currency.lower()}_perp_pairs.txt".
@@ -35,29 +48,26 @@ def save_pairs_for_tradingview(pairs, base_currency, type = 'swap', filename=Non
     if filename is None:
         filename = f"{base_currency.lower()}_{type}_pairs.txt"
 
-    type_str = 'PERP' if type == 'swap' else ''
-
-    with open(filename, "w") as f:
-        for pair in pairs:
-            symbol = pair.split(':')[0].replace("/", "")
-            tradingview_format = f"BINANCE:{symbol}{type_str}\n"
-            f.write(tradingview_format)
+    lines = tradingview_lines(pairs, 'binance', type)
 
-    print(f"{base_currency} {type} pairs saved to {filename} in TradingView format.")
+    # Only rewrite the file when its content changed
+    if outputs.write_list(filename, lines, {'type': type}):
+        print(f"{base_currency} {type} pairs saved to {filename} in TradingView format.")
 
-def get_and_save_pairs(base_currency = 'USDT', type = 'swap'):
+def get_and_save_pairs(base_currency = 'USDT', type = 'swap', markets=None):
     """
     Retrieves and saves perpetual pairs for a specific base currency.
 
     Args:
         base_currency (str): The base currency to process (e.g., 'USDT', 'USDC', 'FDUSD').
         type (str): The type of pairs to retrieve ('swap' for perpetual pairs or 'spot' for spot pairs).
+        markets (dict, optional): Markets already returned by load_markets(), shared between calls.
 
     Returns:
         None
     """
     print(f"Getting {base_currency} {type} pairs...")
-    pairs = get_pairs(base_currency, type)
+    pairs = SymbolTable.from_pairs('binance', get_pairs(base_currency, type, markets), type)
     print(f"{base_currency} {type} pairs: {len(pairs)} found")
     save_pairs_for_tradingview(pairs, base_currency, type)
 
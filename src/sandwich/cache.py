@@ -0,0 +1,253 @@
+"""
+On-disk cache of ccxt load_markets() results, one compact JSON file per exchange.
+Bulk tickers and open interest are cached next to them with a shorter TTL.
+"""
+
+import json
+import os
+import time
+
+from sandwich import metrics
+from sandwich.fileutil import atomic_write
+
+DEFAULT_CACHE_DIR = os.environ.get('SANDWICH_CACHE_DIR', '.sandwich_cache')
+DEFAULT_TTL = int(os.environ.get('SANDWICH_MARKETS_TTL', 3600))
+DEFAULT_TICKERS_TTL = int(os.environ.get('SANDWICH_TICKERS_TTL', 300))
+
+# Only the market fields the tool actually reads are persisted
+MARKET_FIELDS = ('id', 'symbol', 'base', 'baseId', 'quote', 'settle', 'type', 'active',
+                 'spot', 'swap', 'future', 'option', 'contract', 'linear', 'inverse')
+TICKER_FIELDS = ('last', 'baseVolume', 'quoteVolume')
+
+settings = {
+    'cache_dir': DEFAULT_CACHE_DIR,
+    'ttl': DEFAULT_TTL,
+    'tickers_ttl': DEFAULT_TICKERS_TTL,
+    'refresh': False,
+}
+
+def configure(cache_dir=None, ttl=None, refresh=None, tickers_ttl=None):
+    """
+    Updates the cache settings used by load_markets and load_tickers.
+
+    Args:
+        cache_dir (str, optional): The directory holding the cache files.
+        ttl (int, optional): The number of seconds a cached market map stays fresh.
+                             A TTL of 0 disables reading from the cache.
+        refresh (bool, optional): Whether to ignore cached data and always fetch.
+        tickers_ttl (int, optional): The number of seconds cached tickers stay fresh.
+
+    Returns:
+        None
+    """
+    if cache_dir is not None:
+        settings['cache_dir'] = cache_dir
+    if ttl is not None:
+        settings['ttl'] = ttl
+    if refresh is not None:
+        settings['refresh'] = refresh
+    if tickers_ttl is not None:
+        settings['tickers_ttl'] = tickers_ttl
+
+def cache_path(exchange_id, cache_dir=None, kind='markets'):
+    """
+    Returns the cache file path for an exchange.
+
+    Args:
+        exchange_id (str): The ccxt exchange ID (e.g., 'binance', 'hyperliquid').
+        cache_dir (str, optional): The cache directory. Defaults to the configured one.
+        kind (str): The cached data ('markets', 'tickers' or 'open_interest').
+
+    Returns:
+        str: The path of the cache file.
+    """
+    return os.path.join(cache_dir or settings['cache_dir'], kind, f'{exchange_id.lower()}.json')
+
+def compact_markets(markets):
+    """
+    Reduces a ccxt market map to the fields listed in MARKET_FIELDS.
+
+    Args:
+        markets (dict): The markets returned by load_markets().
+
+    Returns:
+        dict: The compact markets keyed by symbol.
+    """
+    return {symbol: {field: market.get(field) for field in MARKET_FIELDS if field in market}
+            for symbol, market in markets.items()}
+
+def read_cache(exchange_id, cache_dir=None, kind='markets'):
+    """
+    Reads a cached market map (or other cached data of the given kind).
+
+    Args:
+        exchange_id (str): The ccxt exchange ID.
+        cache_dir (str, optional): The cache directory. Defaults to the configured one.
+        kind (str): The cached data ('markets', 'tickers' or 'open_interest').
+
+    Returns:
+        tuple: The fetch timestamp and the markets, or (None, None) if there is no usable cache.
+    """
+    path = cache_path(exchange_id, cache_dir, kind)
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return data['fetched_at'], data[kind]
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+def write_cache(exchange_id, markets, cache_dir=None):
+    """
+    Atomically writes a compact market map to the cache.
+
+    Args:
+        exchange_id (str): The ccxt exchange ID.
+        markets (dict): The markets returned by load_markets().
+        cache_dir (str, optional): The cache directory. Defaults to the configured one.
+
+    Returns:
+        dict: The compact markets that were written.
+    """
+    compact = compact_markets(markets)
+    data = {'exchange': exchange_id, 'fetched_at': time.time(), 'markets': compact}
+    atomic_write(cache_path(exchange_id, cache_dir), json.dumps(data, separators=(',', ':')))
+    return compact
+
+def load_markets(exchange_id, ttl=None, refresh=None, cache_dir=None, exchange=None):
+    """
+    Loads the market map for an exchange, using the on-disk cache while it is fresh.
+
+    If fetching fails and a stale cache exists, the stale markets are returned instead.
+
+    Args:
+        exchange_id (str): The ccxt exchange ID (e.g., 'binance', 'bybit', 'okx').
+        ttl (int, optional): Seconds the cache stays fresh. Defaults to the configured TTL.
+        refresh (bool, optional): Whether to bypass the cache. Defaults to the configured value.
+        cache_dir (str, optional): The cache directory. Defaults to the configured one.
+        exchange (ccxt.Exchange, optional): A long-lived exchange instance to reload markets with.
+                                            A new instance is created if not provided.
+
+    Returns:
+        dict: The compact markets keyed by ccxt symbol.
+    """
+    ttl = settings['ttl'] if ttl is None else ttl
+    refresh = settings['refresh'] if refresh is None else refresh
+
+    with metrics.span('load_markets', exchange=exchange_id) as record:
+        fetched_at, cached = read_cache(exchange_id, cache_dir)
+        if cached is not None and not refresh and time.time() - fetched_at < ttl:
+            metrics.incr('market_cache_hits_total')
+            record['items'] = len(cached)
+            return cached
+
+        metrics.incr('market_cache_misses_total')
+        try:
+            if exchange is None:
+                # ccxt is slow to import, so it is only loaded on a cache miss
+                exchange = create_exchange(exchange_id)
+            markets = exchange.load_markets(reload=True)
+        except Exception as e:
+            if cached is None:
+                raise
+            metrics.incr('market_cache_stale_total')
+            print(f"Error loading {exchange_id} markets, using stale cache: {e}")
+            record['items'] = len(cached)
+            return cached
+
+        record['items'] = len(markets)
+        return write_cache(exchange_id, markets, cache_dir)
+
+def create_exchange(exchange_id):
+    """
+    Creates a ccxt exchange instance, importing ccxt only when it is needed.
+    """
+    import ccxt
+    return getattr(ccxt, exchange_id)()
+
+def load_cached(kind, cache_id, fetch, ttl=None, refresh=None, cache_dir=None):
+    """
+    Returns cached data of the given kind while it is fresh, otherwise fetches and caches it.
+
+    If fetching fails and stale data is cached, the stale data is returned instead.
+
+    Args:
+        kind (str): The cached data ('tickers' or 'open_interest').
+        cache_id (str): The cache file name (e.g., 'binance_swap').
+        fetch (callable): Returns the data to cache.
+        ttl (int, optional): Seconds the cache stays fresh. Defaults to the configured tickers TTL.
+        refresh (bool, optional): Whether to bypass the cache. Defaults to the configured value.
+        cache_dir (str, optional): The cache directory. Defaults to the configured one.
+
+    Returns:
+        dict: The data keyed by ccxt symbol.
+    """
+    ttl = settings['tickers_ttl'] if ttl is None else ttl
+    refresh = settings['refresh'] if refresh is None else refresh
+
+    with metrics.span(f'load_{kind}', source=cache_id) as record:
+        fetched_at, cached = read_cache(cache_id, cache_dir, kind)
+        if cached is not None and not refresh and time.time() - fetched_at < ttl:
+            metrics.incr(f'{kind}_cache_hits_total')
+            record['items'] = len(cached)
+            return cached
+
+        metrics.incr(f'{kind}_cache_misses_total')
+        try:
+            data = fetch()
+        except Exception as e:
+            if cached is None:
+                raise
+            print(f"Error loading {cache_id} {kind}, using stale cache: {e}")
+            record['items'] = len(cached)
+            return cached
+
+        record['items'] = len(data)
+        payload = {'exchange': cache_id, 'fetched_at': time.time(), kind: data}
+        atomic_write(cache_path(cache_id, cache_dir, kind), json.dumps(payload, separators=(',', ':')))
+        return data
+
+def load_tickers(exchange_id, market_type='swap', ttl=None, refresh=None, cache_dir=None, exchange=None):
+    """
+    Loads the tickers of every market of a type with one bulk fetch_tickers call, cached per exchange.
+
+    Args:
+        exchange_id (str): The ccxt exchange ID (e.g., 'binance').
+        market_type (str): The market type ('swap' or 'spot').
+        ttl (int, optional): Seconds the cache stays fresh. Defaults to the configured tickers TTL.
+        refresh (bool, optional): Whether to bypass the cache. Defaults to the configured value.
+        cache_dir (str, optional): The cache directory. Defaults to the configured one.
+        exchange (ccxt.Exchange, optional): A long-lived exchange instance to fetch with.
+
+    Returns:
+        dict: The compact tickers (TICKER_FIELDS) keyed by ccxt symbol.
+    """
+    def fetch():
+        tickers = (exchange or create_exchange(exchange_id)).fetch_tickers(params={'type': market_type})
+        return {symbol: {field: ticker.get(field) for field in TICKER_FIELDS} for symbol, ticker in tickers.items()}
+
+    return load_cached('tickers', f'{exchange_id}_{market_type}', fetch, ttl, refresh, cache_dir)
+
+def load_open_interest(exchange_id, market_type='swap', ttl=None, refresh=None, cache_dir=None, exchange=None):
+    """
+    Loads the open interest of every contract with one bulk fetch_open_interests call, cached per exchange.
+
+    Args:
+        exchange_id (str): The ccxt exchange ID (e.g., 'okx', 'hyperliquid').
+        market_type (str): The market type ('swap').
+        ttl (int, optional): Seconds the cache stays fresh. Defaults to the configured tickers TTL.
+        refresh (bool, optional): Whether to bypass the cache. Defaults to the configured value.
+        cache_dir (str, optional): The cache directory. Defaults to the configured one.
+        exchange (ccxt.Exchange, optional): A long-lived exchange instance to fetch with.
+
+    Returns:
+        dict: {'amount', 'value'} keyed by ccxt symbol, empty if the exchange has no bulk endpoint.
+    """
+    def fetch():
+        client = exchange or create_exchange(exchange_id)
+        if not client.has.get('fetchOpenInterests'):
+            return {}
+        interests = client.fetch_open_interests(params={'type': market_type})
+        return {symbol: {'amount': oi.get('openInterestAmount'), 'value': oi.get('openInterestValue')}
+                for symbol, oi in interests.items()}
+
+    return load_cached('open_interest', f'{exchange_id}_{market_type}', fetch, ttl, refresh, cache_dir)
@@ -1,14 +1,48 @@
-import requests
+import asyncio
 import json
+import os
+import shutil
 import time
 
-def make_request(url, max_retries=5):
-    for i in range(max_retries):
-        response = requests.get(url)
-        if response.status_code != 429:
-            return response
-        time.sleep(2 ** i)
-    return None  # or raise an exception
+from sandwich import cache, metrics
+from sandwich.fileutil import atomic_write
+from sandwich.httpclient import AsyncClient, RequestFailed, TokenBucket, ensure_client
+
+# coingecko public api coins/markets
+MARKETS_URL = 'https://api.coingecko.com/api/v3/coins/markets?vs_currency=usd&per_page={per_page}'
+# coingecko public api simple/price, only the fields the sort needs
+PRICE_URL = ('https://api.coingecko.com/api/v3/simple/price?vs_currencies=usd'
+             '&include_market_cap=true&include_24hr_vol=true&ids={ids}')
+
+# Full pages are fetched at least this often, so coins entering the top from
+# outside the known table are picked up
+FULL_REFRESH_AGE = 24 * 3600
+
+# Longest simple/price URL built when batching ids, well under common server and proxy limits
+MAX_URL_LENGTH = 8000
+
+# Pages saved by an interrupted download are reused for this long; older ones are fetched again
+RESUME_MAX_AGE = 3600
+
+def make_request(url, max_retries=5, rate_limiter=None, timeout=None):
+    """
+    Makes a single GET request through the async client, retrying on HTTP 429 and transient errors.
+    Blocks until done; use AsyncClient.get inside a running event loop.
+
+    Args:
+        url (str): The URL to request.
+        max_retries (int): The maximum number of attempts.
+        rate_limiter (TokenBucket, optional): The rate limiter shared between requests.
+        timeout (float, optional): The request timeout in seconds.
+
+    Returns:
+        Response: The response, or None if every attempt was rate limited or failed.
+    """
+    async def fetch():
+        async with AsyncClient(timeout=timeout, rate_limiter=rate_limiter, max_retries=max_retries) as client:
+            return await client.get(url)
+
+    return asyncio.run(fetch())
 
 def download_file(url, file_path):
     """
@@ -19,57 +53,361 @@ def download_file(url, file_path):
         file_path (str): The path where the downloaded file will be saved.
 
     Returns:
-        None
-
-    Raises:
-        None
+        bool: True if the file was saved.
     """
-    # Make a request to the URL
+    # Make a request to the URL, None when every attempt failed
     response = make_request(url)
+    if response is None or response.status_code != 200:
+        print("Request failed with status code:", response.status_code if response is not None else None)
+        return False
+
+    # Save the response body to a file, replacing the old one only once it is complete
+    atomic_write(file_path, response.content, 'wb')
+    print(f"File downloaded successfully at {file_path}")
+    return True
+
+def checkpoint_dir():
+    """
+    Returns the directory holding the pages of an unfinished market data download.
+    """
+    return os.path.join(cache.settings['cache_dir'], 'coingecko_pages')
+
+def load_checkpoint(page_urls, max_age=RESUME_MAX_AGE):
+    """
+    Loads the pages saved by an interrupted download of the same URLs.
 
-    # Check if the request was successful
-    if response.status_code == 200:
-        # Save the response body to a file
-        with open(file_path, 'wb') as f:
-            f.write(response.content)
-        print(f"File downloaded successfully at {file_path}")
-    else:
-        print("Request failed with status code:", response.status_code)
+    Args:
+        page_urls (dict): Page number to page URL.
+        max_age (float): Seconds after which a saved page is fetched again.
 
+    Returns:
+        dict: Page number to its market data items, for the pages that can be reused.
+    """
+    done = {}
+    now = time.time()
+    for page, page_url in page_urls.items():
+        try:
+            with open(os.path.join(checkpoint_dir(), f'page_{page}.json'), 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            continue
+        # a page whose saved body is not a list of items is fetched again
+        if not isinstance(saved, dict) or not isinstance(saved.get('items'), list):
+            continue
+        if saved.get('url') == page_url and now - saved.get('fetched_at', 0) <= max_age:
+            done[page] = saved['items']
+    return done
 
-def save_market_data(file_name='marketcap.json'):
+def save_checkpoint_page(page, page_url, items):
+    """
+    Saves one downloaded page so an interrupted download can resume after it.
+    """
+    atomic_write(os.path.join(checkpoint_dir(), f'page_{page}.json'),
+                 json.dumps({'url': page_url, 'fetched_at': time.time(), 'items': items}))
+
+def clear_checkpoint():
+    """
+    Removes the saved pages once the market data file is written.
+    """
+    shutil.rmtree(checkpoint_dir(), ignore_errors=True)
+
+def merge_pages(done):
+    """
+    Joins downloaded pages in page order.
+
+    Pages fetched at different times can overlap when coins move across a page
+    boundary, so only the first occurrence of a coin is kept. Items without an
+    id cannot be told apart and are all kept.
+
+    Args:
+        done (dict): Page number to its market data items.
+
+    Returns:
+        list: The combined market data.
+    """
+    seen = set()
+    all_data = []
+    for page in sorted(done):
+        for item in done[page]:
+            coin_id = item.get('id')
+            if coin_id is None or coin_id not in seen:
+                seen.add(coin_id)
+                all_data.append(item)
+    return all_data
+
+
+async def fetch_market_pages_async(pages=2, per_page=250, url=MARKETS_URL, client=None, resume=True):
+    """
+    Downloads CoinGecko coins/markets pages concurrently over one pooled client.
+
+    Every completed page is saved as a checkpoint. When a page fails, the other
+    requests are cancelled, and the next download resumes from the saved pages.
+
+    Args:
+        pages (int): The number of pages to fetch, starting from page 1.
+        per_page (int): The number of coins per page (maximum 250).
+        url (str): The markets URL template, formatted with per_page.
+        client (AsyncClient, optional): An open client to use. A rate limited one is created if not provided.
+        resume (bool): Whether to reuse the pages saved by an interrupted download.
+
+    Returns:
+        list: The combined market data in page order, or None if any page failed.
+    """
+    base_url = url.format(per_page=per_page)
+    page_urls = {page: f'{base_url}&page={page}' for page in range(1, pages + 1)}
+    done = load_checkpoint(page_urls) if resume else {}
+    if done:
+        metrics.incr('coingecko_pages_resumed_total', len(done))
+        print(f"Resuming with {len(done)} of {pages} pages already downloaded")
+    for page, page_url in page_urls.items():
+        if page not in done:
+            print(page_url)
+
+    async def fetch_page(client, page):
+        response = await client.get(page_urls[page])
+        try:
+            if response is None or response.status_code != 200:
+                raise ValueError
+            items = response.json()
+            if not isinstance(items, list):
+                raise ValueError
+        except ValueError:
+            raise RequestFailed(page_urls[page], response) from None
+        save_checkpoint_page(page, page_urls[page], items)
+        done[page] = items
+
+    with metrics.span('coingecko_fetch', pages=pages) as record:
+        error = None
+        try:
+            async with ensure_client(client, rate_limiter=TokenBucket()) as client:
+                async with asyncio.TaskGroup() as group:
+                    for page in page_urls:
+                        if page not in done:
+                            group.create_task(fetch_page(client, page))
+        except* RequestFailed as failed:
+            # the other pages were cancelled
+            error = failed.exceptions[0]
+        if error is not None:
+            print(error)
+            print(f"{len(done)} of {pages} pages saved, run again to resume")
+            return None
+        all_data = merge_pages(done)
+        record['items'] = len(all_data)
+    return all_data
+
+def fetch_market_pages(pages=2, per_page=250, workers=4, url=MARKETS_URL):
+    """
+    Blocking wrapper of fetch_market_pages_async. Use the async version inside a running event loop.
+
+    Args:
+        pages (int): The number of pages to fetch, starting from page 1.
+        per_page (int): The number of coins per page (maximum 250).
+        workers (int): The maximum number of concurrent requests.
+        url (str): The markets URL template, formatted with per_page.
+
+    Returns:
+        list: The combined market data in page order, or None if any page failed.
+    """
+    async def fetch():
+        async with AsyncClient(limit_per_host=workers, rate_limiter=TokenBucket()) as client:
+            return await fetch_market_pages_async(pages, per_page, url, client)
+
+    return asyncio.run(fetch())
+
+def save_market_data(file_name='marketcap.json', pages=2, workers=4):
     """
     Save market data from the Coingecko public API to a file.
 
     Args:
         file_name (str): The name of the file to save the market data to. Default is 'marketcap.json'.
+        pages (int): The number of 250 coin pages to fetch. Default is 2.
+        workers (int): The maximum number of concurrent page requests. Default is 4.
 
     Returns:
         None
     """
-    # coingecko public api coins/markets
-    url = 'https://api.coingecko.com/api/v3/coins/markets?vs_currency=usd&per_page=250'
+    all_data = fetch_market_pages(pages, workers=workers)
+    if not all_data:
+        # the previous file is left untouched
+        return
 
-    # Save the response body to a file
-    with open(file_name, 'w') as f:
-        all_data = []
-        for page in range(1, 3):  # Get 2 pages
-            # Page url:
-            page_url = f'{url}&page={page}'
-            print(page_url)
-            # Make a request to the URL
-            response = make_request(page_url)
+    # count and print the number of items in the list
+    print(f"Number of items in the list: {len(all_data)}")
+    atomic_write(file_name, json.dumps(all_data))
+    clear_checkpoint()
+    save_refresh_state({'full_fetched_at': time.time(), 'pages': pages})
+
+    print(f"Market data saved successfully to {file_name}")
+
+def refresh_state_path():
+    """
+    Returns the path of the file recording when full market pages were last fetched.
+    """
+    return os.path.join(cache.settings['cache_dir'], 'coingecko.json')
 
-            # Check if the request was successful
-            if response.status_code == 200:
-                data = response.json()
-                all_data.extend(data)
-            else:
-                print(f"Request failed for page {page} with status code:", response.status_code)
-                return
+def load_refresh_state():
+    """
+    Loads the refresh state, or an empty dict if there is none.
+    """
+    try:
+        with open(refresh_state_path(), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-        # count and print the number of items in the list
-        print(f"Number of items in the list: {len(all_data)}")
-        json.dump(all_data, f)
+def save_refresh_state(state):
+    """
+    Saves the refresh state next to the market cache.
+    """
+    path = refresh_state_path()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    atomic_write(path, json.dumps(state))
 
-    print(f"Market data saved successfully to {file_name}")
+def batch_urls(ids, url=PRICE_URL, batch_size=None, max_length=MAX_URL_LENGTH):
+    """
+    Packs ids into as few price URLs as the URL length allows.
+
+    Args:
+        ids (list): The CoinGecko coin ids.
+        url (str): The price URL template, formatted with the comma-separated ids.
+        batch_size (int, optional): The maximum number of ids per URL. None only bounds the length.
+        max_length (int): The maximum URL length. A single id longer than that still gets its own URL.
+
+    Returns:
+        list: The URLs.
+    """
+    base_length = len(url.format(ids=''))
+    urls = []
+    batch = []
+    length = base_length
+    for coin_id in ids:
+        # ids are joined with ',', encoded as-is by the client
+        extra = len(coin_id) + (1 if batch else 0)
+        if batch and (length + extra > max_length or (batch_size and len(batch) >= batch_size)):
+            urls.append(url.format(ids=','.join(batch)))
+            batch = []
+            length = base_length
+            extra = len(coin_id)
+        batch.append(coin_id)
+        length += extra
+    if batch:
+        urls.append(url.format(ids=','.join(batch)))
+    return urls
+
+async def fetch_prices_async(ids, batch_size=None, url=PRICE_URL, client=None):
+    """
+    Downloads the price, market cap and 24h volume of known coins with simple/price.
+    The ids are packed into as few requests as the URL length allows.
+
+    Args:
+        ids (list): The CoinGecko coin ids.
+        batch_size (int, optional): The maximum number of ids per request. None only bounds the URL length.
+        url (str): The price URL template, formatted with the comma-separated ids.
+        client (AsyncClient, optional): An open client to use. A rate limited one is created if not provided.
+
+    Returns:
+        dict: Coin id to {'usd', 'usd_market_cap', 'usd_24h_vol'}, or None if any batch failed.
+    """
+    urls = batch_urls(ids, url, batch_size)
+
+    prices = {}
+    with metrics.span('coingecko_prices', batches=len(urls)) as record:
+        try:
+            async with ensure_client(client, rate_limiter=TokenBucket()) as client:
+                responses = await client.get_all(urls)
+            for response in responses:
+                prices.update(response.json())
+        except RequestFailed as e:
+            print(f"Price request failed with status code: {e.status_code}")
+            return None
+        except (ValueError, TypeError) as e:
+            # an HTML error page or a body that is not an id -> price object
+            print(f"Invalid price response: {e}")
+            return None
+        record['items'] = len(prices)
+    return prices
+
+def fetch_prices(ids, batch_size=None, workers=4, url=PRICE_URL):
+    """
+    Blocking wrapper of fetch_prices_async. Use the async version inside a running event loop.
+
+    Returns:
+        dict: Coin id to {'usd', 'usd_market_cap', 'usd_24h_vol'}, or None if any batch failed.
+    """
+    async def fetch():
+        async with AsyncClient(limit_per_host=workers, rate_limiter=TokenBucket()) as client:
+            return await fetch_prices_async(ids, batch_size, url, client)
+
+    return asyncio.run(fetch())
+
+def apply_prices(items, prices):
+    """
+    Updates market data items with fresh prices and re-ranks them by market cap.
+
+    Args:
+        items (list): The market data items from the last full fetch.
+        prices (dict): The result of fetch_prices.
+
+    Returns:
+        tuple: The updated items in market cap order, and the ids missing from prices.
+    """
+    updated = []
+    missing = []
+    for item in items:
+        price = prices.get(item['id'])
+        if not price:
+            missing.append(item['id'])
+            continue
+        updated.append({**item,
+                        'current_price': price.get('usd', item.get('current_price')),
+                        'market_cap': price.get('usd_market_cap', item.get('market_cap')),
+                        'total_volume': price.get('usd_24h_vol', item.get('total_volume'))})
+    updated.sort(key=lambda item: item.get('market_cap') or 0, reverse=True)
+    for rank, item in enumerate(updated, 1):
+        item['market_cap_rank'] = rank
+    return updated, missing
+
+def refresh_market_data(file_name='marketcap.json', pages=2, workers=4, top_n=None, max_age=FULL_REFRESH_AGE):
+    """
+    Refreshes saved market data by fetching only the volume fields of the known coins.
+
+    The coins of the last full fetch are re-priced with simple/price. Full pages are
+    fetched instead when there is no previous data, it is older than max_age, a known
+    coin disappeared, or the top_n membership by market cap changed.
+
+    Args:
+        file_name (str): The market data file to refresh. Default is 'marketcap.json'.
+        pages (int): The number of 250 coin pages for full fetches. Default is 2.
+        workers (int): The maximum number of concurrent requests. Default is 4.
+        top_n (int, optional): The number of top coins whose membership is watched.
+                               Defaults to 80% of the known coins, so coins moving
+                               across the cutoff are still in the table.
+        max_age (float): Seconds after which full pages are fetched regardless.
+
+    Returns:
+        None
+    """
+    state = load_refresh_state()
+    try:
+        with open(file_name, 'r') as f:
+            items = json.load(f)
+    except (OSError, ValueError):
+        items = None
+
+    if not items or state.get('pages') != pages or time.time() - state.get('full_fetched_at', 0) > max_age:
+        print("Fetching full market pages")
+        return save_market_data(file_name, pages, workers)
+
+    prices = fetch_prices([item['id'] for item in items], workers=workers)
+    if prices is None:
+        return
+
+    updated, missing = apply_prices(items, prices)
+    top_n = top_n or int(len(items) * 0.8)
+    if missing or {i['id'] for i in items[:top_n]} != {i['id'] for i in updated[:top_n]}:
+        print(f"Top {top_n} membership changed, fetching full market pages")
+        return save_market_data(file_name, pages, workers)
+
+    metrics.incr('coingecko_delta_refreshes_total')
+    atomic_write(file_name, json.dumps(updated))
+    print(f"Volumes of {len(updated)} coins refreshed in {file_name}")
@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+def atomic_write(path, data, mode='w'):
+    """
+    Writes data to a file atomically.
+
+    The data is written to a temporary file in the same directory which is then
+    renamed over the destination, so readers never see a partially written file.
+
+    Args:
+        path (str): The destination file path.
+        data (str or bytes): The content to write.
+        mode (str): 'w' for text or 'wb' for bytes.
+
+    Returns:
+        None
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
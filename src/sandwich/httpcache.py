@@ -0,0 +1,242 @@
+"""
+On-disk HTTP response cache used by httpclient.AsyncClient.
+
+Response bodies are stored per URL next to the market cache, with an index
+kept in least recently used order and trimmed to a size bound. Fresh entries
+(Cache-Control max-age or Expires) are served without a request, stale ones
+are revalidated with If-None-Match / If-Modified-Since so an unchanged page
+costs a 304 without a body. In offline mode every cached entry is served
+without touching the network, and a cached copy can stand in for a request
+that failed after all its retries.
+"""
+
+import email.message
+import hashlib
+import json
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from sandwich import metrics
+from sandwich.fileutil import atomic_write
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Response headers kept with a cached body
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Date', 'Cache-Control', 'Expires')
+
+def cache_control(headers):
+    """
+    Parses a Cache-Control header.
+
+    Args:
+        headers (Mapping): The response headers (case-insensitive).
+
+    Returns:
+        dict: Lower-cased directive to its value (None for directives without one).
+    """
+    directives = {}
+    for part in (headers.get('Cache-Control') or '').split(','):
+        name, _, value = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+def freshness_lifetime(headers):
+    """
+    Returns the number of seconds a response stays fresh.
+
+    max-age takes precedence over Expires. A response with neither, or with
+    no-cache, is stored but revalidated on every use.
+
+    Args:
+        headers (Mapping): The response headers (case-insensitive).
+
+    Returns:
+        float: The freshness lifetime, 0 if the response must be revalidated.
+    """
+    directives = cache_control(headers)
+    if 'no-cache' in directives:
+        return 0.0
+    try:
+        return max(0.0, float(directives['max-age']))
+    except (KeyError, TypeError, ValueError):
+        pass
+    try:
+        expires = parsedate_to_datetime(headers.get('Expires')).timestamp()
+        date = parsedate_to_datetime(headers.get('Date')).timestamp() if headers.get('Date') else time.time()
+        return max(0.0, expires - date)
+    except (TypeError, ValueError):
+        return 0.0
+
+def is_cacheable(response):
+    """
+    Checks whether a response may be stored: a 200 without Cache-Control no-store.
+    """
+    return response.status_code == 200 and 'no-store' not in cache_control(response.headers)
+
+def make_headers(items):
+    """
+    Builds a case-insensitive header mapping from stored (name, value) pairs.
+    """
+    headers = email.message.Message()
+    for name, value in items:
+        headers[name] = value
+    return headers
+
+class ResponseCache:
+    """
+    Size-bounded LRU store of response bodies keyed by URL.
+
+    The index is loaded on first use and written back by save(), which the
+    client calls when it is closed. Bodies are written as soon as they are stored.
+
+    Args:
+        directory (str): The directory holding the index and the bodies.
+        max_bytes (int): The maximum total size of the stored bodies.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries = None
+        self.size = 0
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def index_path(self):
+        return os.path.join(self.directory, 'index.json')
+
+    def body_path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest() + '.body')
+
+    def load(self):
+        """
+        Loads the index if it is not loaded yet. Must be called with the lock held.
+        """
+        if self.entries is not None:
+            return
+        try:
+            with open(self.index_path(), 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        # bodies can be missing if the process stopped before the index was saved
+        self.entries = {url: entry for url, entry in entries.items() if os.path.exists(self.body_path(url))}
+        self.size = sum(entry['size'] for entry in self.entries.values())
+
+    def lookup(self, url):
+        """
+        Returns the cached entry of a URL and marks it as recently used.
+
+        Args:
+            url (str): The requested URL.
+
+        Returns:
+            dict: The entry ('stored_at', 'lifetime', 'headers', 'size'), or None if the URL is not cached.
+        """
+        with self.lock:
+            self.load()
+            entry = self.entries.pop(url, None)
+            if entry is not None:
+                self.entries[url] = entry
+                self.dirty = True
+            return entry
+
+    def is_fresh(self, entry, now=None):
+        """
+        Checks whether an entry can be served without revalidation.
+        """
+        return (now or time.time()) - entry['stored_at'] < entry['lifetime']
+
+    def read(self, url, entry):
+        """
+        Returns a cached entry as a Response, or None if its body is gone.
+        """
+        from sandwich.httpclient import Response
+        try:
+            with open(self.body_path(url), 'rb') as f:
+                content = f.read()
+        except OSError:
+            return None
+        return Response(url, 200, make_headers(entry['headers']), content)
+
+    def validators(self, entry):
+        """
+        Returns the conditional request headers that revalidate an entry.
+        """
+        headers = make_headers(entry['headers'])
+        validators = {}
+        if headers.get('ETag'):
+            validators['If-None-Match'] = headers['ETag']
+        if headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = headers['Last-Modified']
+        return validators
+
+    def store(self, response):
+        """
+        Stores a response if it is cacheable, evicting the least recently used bodies over max_bytes.
+
+        Args:
+            response (Response): The response to a GET request.
+
+        Returns:
+            bool: True if the response was stored.
+        """
+        if not is_cacheable(response) or len(response.content) > self.max_bytes:
+            return False
+        atomic_write(self.body_path(response.url), response.content, 'wb')
+        entry = {
+            'stored_at': time.time(),
+            'lifetime': freshness_lifetime(response.headers),
+            'headers': [(name, response.headers[name]) for name in STORED_HEADERS if response.headers.get(name)],
+            'size': len(response.content),
+        }
+        with self.lock:
+            self.load()
+            old = self.entries.pop(response.url, None)
+            if old is not None:
+                self.size -= old['size']
+            self.entries[response.url] = entry
+            self.size += entry['size']
+            self.evict()
+            self.dirty = True
+        return True
+
+    def refresh(self, url, entry, response):
+        """
+        Restarts the freshness lifetime of an entry revalidated by a 304 response.
+        """
+        headers = dict(entry['headers'])
+        for name in STORED_HEADERS:
+            if response.headers.get(name):
+                headers[name] = response.headers[name]
+        with self.lock:
+            entry['headers'] = list(headers.items())
+            entry['stored_at'] = time.time()
+            entry['lifetime'] = freshness_lifetime(make_headers(entry['headers']))
+            self.dirty = True
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the bodies fit in max_bytes. Must be called with the lock held.
+        """
+        while self.size > self.max_bytes and self.entries:
+            url = next(iter(self.entries))
+            self.size -= self.entries.pop(url)['size']
+            metrics.incr('http_cache_evictions_total')
+            try:
+                os.remove(self.body_path(url))
+            except OSError:
+                pass
+
+    def save(self):
+        """
+        Writes the index if it changed since it was loaded.
+        """
+        with self.lock:
+            if not self.dirty:
+                return
+            atomic_write(self.index_path(), json.dumps(self.entries, separators=(',', ':')))
+            self.dirty = False
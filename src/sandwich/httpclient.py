@@ -0,0 +1,414 @@
+"""
+Asyncio HTTP client used for the REST calls.
+
+Connections are pooled and kept alive, concurrent requests to one host are
+limited by a per-host semaphore, every request has a timeout, and a batch of
+requests is cancelled as soon as one of them fails. aiohttp (installed with
+ccxt) is used by default; with http2 enabled and httpx installed
+(pip install 'httpx[http2]') requests go over HTTP/2 instead.
+
+GET responses go through the on-disk response cache (see httpcache).
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from sandwich import cache, metrics
+from sandwich.httpcache import DEFAULT_MAX_BYTES, ResponseCache
+
+settings = {
+    'http2': False,
+    'timeout': 30,
+    'limit_per_host': 4,
+    'cache': True,
+    'cache_max_bytes': DEFAULT_MAX_BYTES,
+    'offline': False,
+    # how long past its freshness a cached response may stand in for a failed request (off by default)
+    'stale_if_error': 0,
+}
+
+def configure(http2=None, timeout=None, limit_per_host=None, cache=None, cache_max_bytes=None, offline=None,
+              stale_if_error=None):
+    """
+    Updates the defaults used by new AsyncClient instances.
+
+    Args:
+        http2 (bool, optional): Whether to use HTTP/2 when httpx is installed.
+        timeout (float, optional): The total timeout of a request in seconds.
+        limit_per_host (int, optional): The maximum number of concurrent requests per host.
+        cache (bool, optional): Whether to use the on-disk response cache.
+        cache_max_bytes (int, optional): The maximum size of the cached bodies.
+        offline (bool, optional): Whether to serve cached responses, fresh or stale, without any request.
+        stale_if_error (float, optional): Seconds past its freshness a cached response may be served
+                                          when the request failed. 0 never serves stale responses.
+
+    Returns:
+        None
+    """
+    if http2 is not None:
+        settings['http2'] = http2
+    if timeout is not None:
+        settings['timeout'] = timeout
+    if limit_per_host is not None:
+        settings['limit_per_host'] = limit_per_host
+    if cache is not None:
+        settings['cache'] = cache
+    if cache_max_bytes is not None:
+        settings['cache_max_bytes'] = cache_max_bytes
+    if offline is not None:
+        settings['offline'] = offline
+    if stale_if_error is not None:
+        settings['stale_if_error'] = stale_if_error
+
+# The response cache shared by every client, created on first use
+shared_cache = None
+
+def default_cache():
+    """
+    Returns the shared response cache in the configured cache directory, or None if caching is disabled.
+    """
+    global shared_cache
+    if not settings['cache'] and not settings['offline']:
+        return None
+    directory = os.path.join(cache.settings['cache_dir'], 'http')
+    if shared_cache is None or shared_cache.directory != directory:
+        shared_cache = ResponseCache(directory, settings['cache_max_bytes'])
+    shared_cache.max_bytes = settings['cache_max_bytes']
+    return shared_cache
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter shared by all request workers.
+
+    acquire() blocks the calling thread; acquire_async() waits without blocking the event loop.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (int): Maximum number of tokens, i.e. the allowed burst size.
+    """
+
+    def __init__(self, rate=0.5, capacity=5):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Consumes a token if one is available.
+
+        Returns:
+            float: 0 if a token was consumed, otherwise the number of seconds to wait before retrying.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if now >= self.blocked_until and self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+
+    def acquire(self):
+        """
+        Blocks until a token is available and consumes it.
+        """
+        while wait := self.reserve():
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """
+        Waits until a token is available and consumes it.
+        """
+        while wait := self.reserve():
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """
+        Stops handing out tokens for the given number of seconds, e.g. after a 429.
+        """
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+def retry_after(response, default):
+    """
+    Returns the delay requested by a Retry-After header, in seconds.
+
+    Args:
+        response (Response): The rate limited response.
+        default (float): The delay to use when the header is missing or invalid.
+
+    Returns:
+        float: The number of seconds to wait.
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+class Response:
+    """
+    A fully read HTTP response.
+
+    Args:
+        url (str): The requested URL.
+        status_code (int): The HTTP status code.
+        headers (Mapping): The response headers (case-insensitive).
+        content (bytes): The response body.
+    """
+
+    __slots__ = ('url', 'status_code', 'headers', 'content')
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        """
+        Decodes the body as JSON.
+        """
+        return json.loads(self.content)
+
+class RequestFailed(Exception):
+    """
+    Raised by AsyncClient.get_all when a request did not return HTTP 200.
+
+    Args:
+        url (str): The failed URL.
+        response (Response, optional): The last response, None if every attempt failed.
+    """
+
+    def __init__(self, url, response=None):
+        self.url = url
+        self.response = response
+        self.status_code = response.status_code if response is not None else None
+        super().__init__(f"Request failed for {url} with status code: {self.status_code}")
+
+class AsyncClient:
+    """
+    Pooled keep-alive HTTP client with per-host concurrency limits, timeouts and retries.
+
+    Use it as an async context manager so the pool is closed afterwards.
+
+    Args:
+        limit_per_host (int, optional): The maximum number of concurrent requests per host.
+        timeout (float, optional): The total timeout of a request in seconds.
+        http2 (bool, optional): Whether to use HTTP/2 (requires httpx with h2).
+        rate_limiter (TokenBucket, optional): The rate limiter shared by every request.
+        max_retries (int): The maximum number of attempts per request.
+        response_cache (ResponseCache, optional): The cache of GET responses. Defaults to the shared one.
+    """
+
+    def __init__(self, limit_per_host=None, timeout=None, http2=None, rate_limiter=None, max_retries=5,
+                 response_cache=None):
+        self.limit_per_host = limit_per_host or settings['limit_per_host']
+        self.timeout = timeout or settings['timeout']
+        self.http2 = settings['http2'] if http2 is None else http2
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.response_cache = response_cache or default_cache()
+        self.hosts = {}
+        self.session = None
+        self.backend = None
+        self.errors = ()
+
+    async def __aenter__(self):
+        if self.http2:
+            try:
+                import httpx
+                self.session = httpx.AsyncClient(http2=True, timeout=self.timeout,
+                                                 limits=httpx.Limits(max_keepalive_connections=self.limit_per_host * 4))
+                self.backend = 'httpx'
+                self.errors = (httpx.TransportError,)
+                return self
+            except ImportError:
+                print("HTTP/2 needs httpx[http2], falling back to HTTP/1.1")
+        import aiohttp
+        connector = aiohttp.TCPConnector(limit_per_host=self.limit_per_host)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self.backend = 'aiohttp'
+        self.errors = (aiohttp.ClientError, TimeoutError)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.response_cache is not None:
+            self.response_cache.save()
+        if self.backend == 'httpx':
+            await self.session.aclose()
+        else:
+            await self.session.close()
+
+    def host_limit(self, url):
+        """
+        Returns the semaphore limiting concurrent requests to the host of a URL.
+        """
+        host = urlsplit(url).netloc
+        if host not in self.hosts:
+            self.hosts[host] = asyncio.Semaphore(self.limit_per_host)
+        return self.hosts[host]
+
+    async def fetch(self, url, headers=None):
+        """
+        Makes a single GET request and reads the whole body.
+
+        Returns:
+            Response: The response.
+        """
+        async with self.host_limit(url):
+            if self.backend == 'httpx':
+                response = await self.session.get(url, headers=headers)
+                return Response(url, response.status_code, response.headers, response.content)
+            async with self.session.get(url, headers=headers) as response:
+                return Response(url, response.status, response.headers, await response.read())
+
+    async def get(self, url):
+        """
+        Makes a GET request through the response cache.
+
+        A fresh cached response is returned without a request and a stale one is
+        revalidated. When the request fails and stale_if_error is set, a cached
+        response no older than stale_if_error past its freshness is returned instead.
+
+        Args:
+            url (str): The URL to request.
+
+        Returns:
+            Response: The response, or None if every attempt was rate limited or failed.
+        """
+        store = self.response_cache
+        entry = store.lookup(url) if store is not None else None
+        if entry is not None and (settings['offline'] or store.is_fresh(entry)):
+            cached = store.read(url, entry)
+            if cached is not None:
+                metrics.incr('http_cache_hits_total')
+                return cached
+        if settings['offline']:
+            metrics.incr('http_cache_misses_total')
+            print(f"{url} is not cached, skipped in offline mode")
+            return None
+        if store is not None:
+            metrics.incr('http_cache_misses_total')
+
+        response = await self.get_uncached(url, store.validators(entry) if entry is not None else None)
+        if response is not None and response.status_code == 304 and entry is not None:
+            metrics.incr('http_cache_revalidated_total')
+            store.refresh(url, entry, response)
+            cached = store.read(url, entry)
+            if cached is not None:
+                return cached
+            # the body was evicted meanwhile, fetch it again in full
+            response = await self.get_uncached(url)
+        if response is not None and response.status_code < 500:
+            if store is not None:
+                store.store(response)
+            return response
+
+        if entry is not None and settings['stale_if_error'] > 0:
+            age = time.time() - entry['stored_at']
+            if age - entry['lifetime'] <= settings['stale_if_error']:
+                cached = store.read(url, entry)
+                if cached is not None:
+                    metrics.incr('http_cache_stale_total')
+                    print(f"Request to {url} failed, serving a cached response from {age / 60:.0f} minutes ago",
+                          file=sys.stderr)
+                    return cached
+        return response
+
+    async def get_uncached(self, url, headers=None):
+        """
+        Makes a GET request, retrying on HTTP 429, timeouts and connection errors.
+
+        Args:
+            url (str): The URL to request.
+            headers (dict, optional): Extra request headers, e.g. the cache validators.
+
+        Returns:
+            Response: The response, or None if every attempt was rate limited or failed.
+        """
+        for i in range(self.max_retries):
+            if self.rate_limiter:
+                await self.rate_limiter.acquire_async()
+            if i:
+                metrics.incr('http_retries_total')
+            metrics.incr('http_requests_total')
+            try:
+                response = await self.fetch(url, headers)
+            except self.errors as e:
+                metrics.incr('http_errors_total')
+                print(f"Request to {url} failed: {e!r}")
+                if i + 1 < self.max_retries:
+                    await asyncio.sleep(2 ** i)
+                continue
+            metrics.incr('http_bytes_downloaded_total', len(response.content))
+            if response.status_code != 429:
+                return response
+            metrics.incr('http_429_total')
+            delay = retry_after(response, 2 ** i)
+            if self.rate_limiter:
+                self.rate_limiter.pause(delay)
+            else:
+                await asyncio.sleep(delay)
+        return None
+
+    async def get_all(self, urls):
+        """
+        Fetches URLs concurrently. As soon as one fails, the outstanding requests are cancelled.
+
+        Args:
+            urls (list): The URLs to request.
+
+        Returns:
+            list: The HTTP 200 responses, in URL order.
+
+        Raises:
+            RequestFailed: If a request did not return HTTP 200.
+        """
+        async def fetch_ok(url):
+            response = await self.get(url)
+            if response is None or response.status_code != 200:
+                raise RequestFailed(url, response)
+            return response
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [group.create_task(fetch_ok(url)) for url in urls]
+        except* RequestFailed as failed:
+            raise failed.exceptions[0] from None
+        return [task.result() for task in tasks]
+
+@contextlib.asynccontextmanager
+async def ensure_client(client=None, **kwargs):
+    """
+    Yields the given open client, or opens a new AsyncClient for the duration of the block.
+
+    Args:
+        client (AsyncClient, optional): An open client.
+        **kwargs: AsyncClient arguments used when a new client is opened.
+
+    Yields:
+        AsyncClient: The client.
+    """
+    if client is not None:
+        yield client
+        return
+    async with AsyncClient(**kwargs) as client:
+        yield client
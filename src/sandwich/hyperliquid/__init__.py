@@ -9,6 +9,9 @@ from sandwich.hyperliquid.pairs import (
     get_and_save_hyperliquid_pairs,
     get_ccxt_pairs,
     save_pairs_for_tradingview,
+    load_markets_concurrently,
+    get_and_save_multi_exchange_pairs,
+    load_symbol_table,
 )
 
 __all__ = [
@@ -18,4 +21,7 @@ __all__ = [
     'get_and_save_hyperliquid_pairs',
     'get_ccxt_pairs',
     'save_pairs_for_tradingview',
+    'load_markets_concurrently',
+    'get_and_save_multi_exchange_pairs',
+    'load_symbol_table',
 ]
\ No newline at end of file
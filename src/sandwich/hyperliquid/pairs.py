@@ -1,8 +1,22 @@
-import ccxt
 import os
-import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-def get_pairs(base_currency='USDC', type='swap'):
+from sandwich import aliases, cache, metrics, outputs, pairfile
+from sandwich.symbols import Symbol, SymbolTable, tradingview_lines
+
+def load_markets():
+    """
+    Loads the market map from Hyperliquid using ccxt.
+    Results are served from the on-disk market cache while it is fresh.
+
+    Returns:
+        dict: The markets keyed by ccxt symbol, as returned by load_markets().
+    """
+    # Use hyperliquid directly through ccxt
+    return cache.load_markets('hyperliquid')
+
+def get_pairs(base_currency='USDC', type='swap', markets=None):
     """
     Retrieves pairs from Hyperliquid exchange using ccxt.
 
@@ -10,14 +24,15 @@ def get_pairs(base_currency='USDC', type='swap'):
         base_currency (str): The base currency to filter pairs (e.g., 'USDC').
                             Note: Hyperliquid uses USDC as the base currency.
         type (str): The type of pairs to retrieve ('swap' for perpetual pairs or 'spot' for spot pairs).
+        markets (dict, optional): Markets already returned by load_markets().
+                                  If not provided, they are loaded from Hyperliquid.
 
     Returns:
         list: A list of trading pairs from Hyperliquid.
     """
     try:
-        # Use hyperliquid directly through ccxt
-        exchange = ccxt.hyperliquid()
-        markets = exchange.load_markets()
+        if markets is None:
+            markets = load_markets()
 
         # Extract pairs with USDC as quote currency (Hyperliquid uses USDC)
         pairs = [symbol for symbol, market in markets.items()
@@ -38,15 +53,22 @@ def normalize_coin_name(coin):
     Returns:
         str: Normalized coin name.
     """
-    # Handle case where Hyperliquid uses 'k' prefix and Binance uses '1000' prefix
-    if coin.startswith('k') and len(coin) > 1 and coin[1].isupper():
-        return coin[1:]  # Remove the 'k' prefix
+    # Handles the 'k' prefix of Hyperliquid, the '1000' style prefixes of Binance and renamed tickers
+    return aliases.active.canonical(coin)
+
+def build_normalized_index(pairs):
+    """
+    Builds a hash index of normalized coin names to pairs.
 
-    # Handle case where Binance uses '1000' prefix
-    if coin.startswith('1000'):
-        return coin[4:]  # Remove the '1000' prefix
+    Args:
+        pairs (list): A list of pairs in CCXT format (e.g., 'BTC/USDT:USDT').
+                      A SymbolTable indexes its symbols itself (SymbolTable.by_coin).
 
-    return coin
+    Returns:
+        dict: A mapping of normalized coin name to pair. When several pairs
+              normalize to the same coin, the last one wins.
+    """
+    return {normalize_coin_name(pair.split('/')[0]): pair for pair in pairs}
 
 def load_pairs_from_file(base_currency='USDT', type='swap'):
     """
@@ -64,28 +86,44 @@ def load_pairs_from_file(base_currency='USDT', type='swap'):
         print(f"Warning: {filename} not found. No pairs will be loaded.")
         return []
 
-    pairs = []
-    with open(filename, "r") as f:
-        for line in f:
-            # Extract the symbol from TradingView format (e.g., BINANCE:BTCUSDTPERP -> BTC/USDT)
-            line = line.strip()
-            if line.startswith("BINANCE:"):
-                symbol = line.split(':', 1)[1]
-                # Remove PERP suffix if present
-                if type == 'swap' and symbol.endswith("PERP"):
-                    symbol = symbol[:-4]
-
-                # Convert to CCXT format (e.g., BTCUSDT -> BTC/USDT)
-                if base_currency in symbol:
-                    base_index = symbol.find(base_currency)
-                    coin = symbol[:base_index]
-                    ccxt_symbol = f"{coin}/{base_currency}"
-                    pairs.append(ccxt_symbol)
+    # Extract the base coins from TradingView format (e.g., BINANCE:BTCUSDTPERP -> BTC)
+    # and convert to CCXT format (e.g., BTC/USDT)
+    pairs = [f"{base}/{base_currency}" for base in pairfile.iter_bases(filename, 'BINANCE', base_currency, type)]
 
     print(f"Loaded {len(pairs)} pairs from {filename}")
     return pairs
 
-def get_ccxt_pairs(exchange_id='binance', base_currency='USDT', type='swap'):
+def load_symbol_table(base_currency='USDT', type='swap'):
+    """
+    Loads an existing Binance pairs file in TradingView format into a symbol table.
+
+    Args:
+        base_currency (str): The base currency of the pairs file (e.g., 'USDT').
+        type (str): The type of pairs ('swap' or 'spot').
+
+    Returns:
+        SymbolTable: The parsed Binance symbols, empty if the file does not exist.
+    """
+    filename = f"{base_currency.lower()}_{type}_pairs.txt"
+    if not os.path.exists(filename):
+        print(f"Warning: {filename} not found. No pairs will be loaded.")
+        return SymbolTable('binance', [])
+    bases = pairfile.iter_bases(filename, 'BINANCE', base_currency, type)
+    table = SymbolTable('binance', [Symbol('binance', base, base_currency, type) for base in bases])
+    print(f"Loaded {len(table)} pairs from {filename}")
+    return table
+
+def load_binance_table(base_currency='USDT', type='swap'):
+    """
+    Returns the Binance symbol table from the saved pairs file, or from the Binance markets if there is none.
+    """
+    table = load_symbol_table(base_currency, type)
+    if not len(table):
+        print(f"No pairs found in file, fetching from Binance API instead...")
+        table = SymbolTable.from_pairs('binance', get_ccxt_pairs('binance', base_currency, type), type)
+    return table
+
+def get_ccxt_pairs(exchange_id='binance', base_currency='USDT', type='swap', markets=None):
     """
     Retrieves pairs from any exchange supported by ccxt.
 
@@ -93,15 +131,16 @@ def get_ccxt_pairs(exchange_id='binance', base_currency='USDT', type='swap'):
         exchange_id (str): The ccxt exchange ID (e.g., 'binance', 'bybit', 'okx').
         base_currency (str): The base currency to filter pairs (e.g., 'USDT').
         type (str): The type of pairs to retrieve ('swap' for perpetual pairs or 'spot' for spot pairs).
+        markets (dict, optional): Markets already loaded for the exchange.
+                                  If not provided, they are loaded through the market cache.
 
     Returns:
         list: A list of trading pairs for the specified exchange and base currency.
     """
     try:
-        # Dynamically create exchange instance based on exchange_id
-        exchange_class = getattr(ccxt, exchange_id)
-        exchange = exchange_class()
-        markets = exchange.load_markets()
+        if markets is None:
+            # Dynamically create exchange instance based on exchange_id (cached on disk)
+            markets = cache.load_markets(exchange_id)
 
         pairs = [symbol for symbol, market in markets.items()
                       if market['active'] and market['quote'] == base_currency and market.get(type, False)]
@@ -111,137 +150,165 @@ def get_ccxt_pairs(exchange_id='binance', base_currency='USDT', type='swap'):
         print(f"Error fetching pairs from {exchange_id}: {e}")
         return []
 
+def load_markets_concurrently(exchange_ids, max_workers=None):
+    """
+    Loads the markets of several exchanges concurrently using a thread pool.
+
+    Args:
+        exchange_ids (list): The ccxt exchange IDs (e.g., ['binance', 'bybit', 'okx']).
+        max_workers (int, optional): The maximum number of concurrent loads.
+                                     Defaults to one worker per exchange.
+
+    Returns:
+        tuple: A dict of exchange ID to markets for the exchanges that loaded,
+               a dict of exchange ID to load time in seconds,
+               and a dict of exchange ID to the error for the exchanges that failed.
+    """
+    def load(exchange_id):
+        start = time.perf_counter()
+        try:
+            return exchange_id, cache.load_markets(exchange_id), None, time.perf_counter() - start
+        except Exception as e:
+            return exchange_id, None, e, time.perf_counter() - start
+
+    markets_by_exchange = {}
+    timings = {}
+    failures = {}
+    with metrics.span('load_exchanges', exchanges=','.join(exchange_ids)) as record, \
+            ThreadPoolExecutor(max_workers=max_workers or max(1, len(exchange_ids))) as executor:
+        for exchange_id, markets, error, elapsed in executor.map(load, exchange_ids):
+            timings[exchange_id] = elapsed
+            # cache.load_markets records its own span; this one also covers failed loads
+            metrics.record('load_exchange', elapsed, exchange=exchange_id, status='ok' if error is None else 'failed')
+            if error is None:
+                markets_by_exchange[exchange_id] = markets
+                print(f"Loaded {exchange_id} markets in {elapsed:.2f}s ({len(markets)} markets)")
+            else:
+                failures[exchange_id] = error
+                metrics.incr('exchange_load_failures_total')
+                print(f"Failed to load {exchange_id} markets after {elapsed:.2f}s: {error}")
+        record['items'] = len(markets_by_exchange)
+
+    return markets_by_exchange, timings, failures
+
 def match_with_binance_pairs(hyperliquid_pairs, binance_base_currency='USDT', type='swap'):
     """
     Matches Hyperliquid pairs (USDC) with equivalent Binance pairs (USDT) for TradingView compatibility.
     Handles special cases like 'k' prefix in Hyperliquid and '1000' prefix in Binance.
 
     Args:
-        hyperliquid_pairs (list): List of Hyperliquid pairs with USDC as the base currency.
+        hyperliquid_pairs (list or SymbolTable): Hyperliquid pairs with USDC as the base currency.
         binance_base_currency (str): The base currency for Binance pairs (typically 'USDT').
         type (str): The type of Binance pairs ('swap' for perpetual or 'spot').
 
     Returns:
-        list: List of matched Binance pairs that exist on both exchanges.
+        SymbolTable: The matched Binance symbols that exist on both exchanges.
     """
     # Always load Binance pairs with USDT base currency
-    binance_pairs = load_pairs_from_file(binance_base_currency, type)
-    if not binance_pairs:
-        print(f"No pairs found in file, fetching from Binance API instead...")
-        binance_pairs = get_ccxt_pairs('binance', binance_base_currency, type)
+    binance_table = load_binance_table(binance_base_currency, type)
+    source = SymbolTable.from_pairs('hyperliquid', hyperliquid_pairs, type)
 
     # Match Hyperliquid pairs with Binance pairs (ignoring the base currency difference)
     matched_pairs = []
     missing_pairs = []
 
-    # Create a dictionary of normalized coin names to Binance pairs for faster lookups
-    binance_normalized = {}
-    for binance_pair in binance_pairs:
-        coin = binance_pair.split('/')[0]
-        normalized_coin = normalize_coin_name(coin)
-        binance_normalized[normalized_coin] = binance_pair
+    # Normalized coin name to Binance symbol, built once per table
+    binance_normalized = binance_table.by_coin
 
     special_matches = 0
     normal_matches = 0
 
-    for hl_pair in hyperliquid_pairs:
-        # Extract the coin part (e.g., BTC/USDC -> BTC)
-        coin = hl_pair.split('/')[0]
-        normalized_coin = normalize_coin_name(coin)
-
-        # Look for match in the normalized dictionary
-        if normalized_coin in binance_normalized:
-            matched_pairs.append(binance_normalized[normalized_coin])
-            if coin != normalized_coin or binance_normalized[normalized_coin].split('/')[0] != normalized_coin:
+    for symbol in source:
+        target = binance_normalized.get(symbol.coin)
+        if target is not None:
+            matched_pairs.append(target)
+            if symbol.base != symbol.coin or target.base != symbol.coin:
                 special_matches += 1
-                print(f"Special match: {coin} (Hyperliquid) -> {binance_normalized[normalized_coin].split('/')[0]} (Binance)")
+                print(f"Special match: {symbol.base} (Hyperliquid) -> {target.base} (Binance)")
             else:
                 normal_matches += 1
         else:
-            missing_pairs.append(hl_pair)
+            missing_pairs.append(symbol)
 
     # Print missing pairs
     if missing_pairs:
         print(f"\nPairs not found in Binance {type} {binance_base_currency}:")
-        for pair in missing_pairs:
-            print(f"  {pair}")
+        for symbol in missing_pairs:
+            print(f"  {symbol.ccxt_symbol}")
 
     print(f"Found {len(matched_pairs)} matching pairs between Hyperliquid (USDC) and Binance (USDT)")
     print(f"  - Normal matches: {normal_matches}")
     print(f"  - Special prefix matches (k -> 1000): {special_matches}")
     print(f"Found {len(missing_pairs)} pairs that exist on Hyperliquid but not on Binance")
 
-    return matched_pairs
+    return SymbolTable('binance', matched_pairs)
 
-def match_pairs_between_exchanges(source_pairs, target_exchange_id='binance', base_currency='USDT', type='swap'):
+def match_pairs_between_exchanges(source_pairs, target_exchange_id='binance', base_currency='USDT', type='swap', target_markets=None):
     """
     Matches pairs from one source with pairs from a target exchange.
     Handles special cases like 'k' prefix and '1000' prefix.
 
     Args:
-        source_pairs (list): List of source exchange pairs.
+        source_pairs (list or SymbolTable): The source exchange pairs.
         target_exchange_id (str): The ccxt exchange ID to match with.
         base_currency (str): The base currency for target exchange pairs.
         type (str): The type of target exchange pairs ('swap' for perpetual or 'spot').
+        target_markets (dict, optional): Markets already loaded for the target exchange.
+                                         When provided, no file or network access is made.
 
     Returns:
-        list: List of matched target exchange pairs that exist on both exchanges.
+        SymbolTable: The matched target exchange symbols that exist on both exchanges.
     """
     # Get target pairs from saved file first if target is Binance, fall back to API
-    if target_exchange_id.lower() == 'binance':
-        target_pairs = load_pairs_from_file(base_currency, type)
-        if not target_pairs:
-            print(f"No pairs found in file, fetching from {target_exchange_id} API instead...")
-            target_pairs = get_ccxt_pairs(target_exchange_id, base_currency, type)
+    if target_markets is not None:
+        target_table = SymbolTable.from_markets(target_exchange_id, target_markets, base_currency, type)
+    elif target_exchange_id.lower() == 'binance':
+        target_table = load_binance_table(base_currency, type)
     else:
-        target_pairs = get_ccxt_pairs(target_exchange_id, base_currency, type)
+        target_table = SymbolTable.from_pairs(target_exchange_id, get_ccxt_pairs(target_exchange_id, base_currency, type),
+                                              type)
+    source = source_pairs if isinstance(source_pairs, SymbolTable) else \
+        SymbolTable.from_pairs('', source_pairs, type)
 
-    # Create a dictionary of normalized coin names to target pairs for faster lookups
-    target_normalized = {}
-    for target_pair in target_pairs:
-        coin = target_pair.split('/')[0]
-        normalized_coin = normalize_coin_name(coin)
-        target_normalized[normalized_coin] = target_pair
+    # Normalized coin name to target symbol, built once per table
+    target_normalized = target_table.by_coin
 
     matched_pairs = []
     missing_pairs = []
     special_matches = 0
     normal_matches = 0
 
-    for source_pair in source_pairs:
-        coin = source_pair.split('/')[0]
-        normalized_coin = normalize_coin_name(coin)
-
-        # Look for match in the normalized dictionary
-        if normalized_coin in target_normalized:
-            matched_pairs.append(target_normalized[normalized_coin])
-            if coin != normalized_coin or target_normalized[normalized_coin].split('/')[0] != normalized_coin:
+    for symbol in source:
+        target = target_normalized.get(symbol.coin)
+        if target is not None:
+            matched_pairs.append(target)
+            if symbol.base != symbol.coin or target.base != symbol.coin:
                 special_matches += 1
-                print(f"Special match: {coin} -> {target_normalized[normalized_coin].split('/')[0]}")
+                print(f"Special match: {symbol.base} -> {target.base}")
             else:
                 normal_matches += 1
         else:
-            missing_pairs.append(source_pair)
+            missing_pairs.append(symbol)
 
     # Print missing pairs
     if missing_pairs:
         print(f"\nPairs not found in {target_exchange_id} {type} {base_currency}:")
-        for pair in missing_pairs:
-            print(f"  {pair}")
+        for symbol in missing_pairs:
+            print(f"  {symbol.ccxt_symbol}")
 
     print(f"Found {len(matched_pairs)} matching pairs in {target_exchange_id}")
     print(f"  - Normal matches: {normal_matches}")
     print(f"  - Special prefix matches: {special_matches}")
     print(f"Found {len(missing_pairs)} pairs that don't exist in {target_exchange_id}")
 
-    return matched_pairs
+    return SymbolTable(target_exchange_id, matched_pairs)
 
 def save_hyperliquid_pairs_for_tradingview(matched_pairs, base_currency, type='swap'):
     """
     Saves Hyperliquid-matched Binance pairs to a file in TradingView format.
 
     Args:
-        matched_pairs (list): List of matched pairs.
+        matched_pairs (list or SymbolTable): The matched pairs.
         base_currency (str): The base currency (e.g., 'USDT').
         type (str): The type of pairs ('swap' or 'spot').
 
@@ -249,22 +316,18 @@ def save_hyperliquid_pairs_for_tradingview(matched_pairs, base_currency, type='s
         None
     """
     filename = f"{base_currency.lower()}_{type}_hype_pairs.txt"
-    type_str = 'PERP' if type == 'swap' else ''
+    lines = tradingview_lines(matched_pairs, 'binance', type)
 
-    with open(filename, "w") as f:
-        for pair in matched_pairs:
-            symbol = pair.split(':')[0].replace("/", "")
-            tradingview_format = f"BINANCE:{symbol}{type_str}\n"
-            f.write(tradingview_format)
-
-    print(f"Hyperliquid-matched {base_currency} {type} pairs saved to {filename} in TradingView format.")
+    # Only rewrite the file when its content changed
+    if outputs.write_list(filename, lines, {'type': type}):
+        print(f"Hyperliquid-matched {base_currency} {type} pairs saved to {filename} in TradingView format.")
 
 def save_pairs_for_tradingview(pairs, exchange_id='binance', base_currency='USDT', type='swap', filename=None):
     """
     Converts pairs to a format importable in TradingView and saves them to a file.
 
     Args:
-        pairs (list): A list of trading pairs.
+        pairs (list or SymbolTable): The trading pairs.
         exchange_id (str): The exchange ID for TradingView (e.g., 'BINANCE', 'BYBIT').
         base_currency (str): The base currency of the pairs.
         type (str): The type of pairs ('swap' or 'spot').
@@ -277,18 +340,13 @@ def save_pairs_for_tradingview(pairs, exchange_id='binance', base_currency='USDT
     if filename is None:
         filename = f"{exchange_id.lower()}_{base_currency.lower()}_{type}_pairs.txt"
 
-    type_str = 'PERP' if type == 'swap' else ''
-    exchange_id_upper = exchange_id.upper()
-
-    with open(filename, "w") as f:
-        for pair in pairs:
-            symbol = pair.split(':')[0].replace("/", "")
-            tradingview_format = f"{exchange_id_upper}:{symbol}{type_str}\n"
-            f.write(tradingview_format)
+    lines = tradingview_lines(pairs, exchange_id, type)
 
-    print(f"{exchange_id} {base_currency} {type} pairs saved to {filename} in TradingView format.")
+    # Only rewrite the file when its content changed
+    if outputs.write_list(filename, lines, {'exchange': exchange_id, 'type': type}):
+        print(f"{exchange_id} {base_currency} {type} pairs saved to {filename} in TradingView format.")
 
-def get_and_save_hyperliquid_pairs(hyperliquid_base_currency='USDC', binance_base_currency='USDT', type='swap'):
+def get_and_save_hyperliquid_pairs(hyperliquid_base_currency='USDC', binance_base_currency='USDT', type='swap', markets=None):
     """
     Retrieves pairs from Hyperliquid (USDC), matches them with Binance (USDT), and saves them.
 
@@ -296,20 +354,24 @@ def get_and_save_hyperliquid_pairs(hyperliquid_base_currency='USDC', binance_bas
         hyperliquid_base_currency (str): The base currency for Hyperliquid (typically 'USDC').
         binance_base_currency (str): The base currency for Binance matching (typically 'USDT').
         type (str): The type of pairs ('swap' for perpetual or 'spot').
+        markets (dict, optional): Hyperliquid markets already returned by load_markets().
 
     Returns:
         None
     """
     print(f"Getting Hyperliquid pairs using ccxt and matching with Binance {binance_base_currency} {type} pairs...")
-    hyperliquid_pairs = get_pairs(hyperliquid_base_currency, type)
+    hyperliquid_pairs = get_pairs(hyperliquid_base_currency, type, markets)
     print(f"Hyperliquid pairs: {len(hyperliquid_pairs)} found")
 
-    matched_pairs = match_with_binance_pairs(hyperliquid_pairs, binance_base_currency, type)
+    with metrics.span('match', source='hyperliquid', target='binance') as record:
+        matched_pairs = match_with_binance_pairs(hyperliquid_pairs, binance_base_currency, type)
+        record['items'] = len(hyperliquid_pairs)
     print(f"Matched pairs: {len(matched_pairs)} found")
 
     save_hyperliquid_pairs_for_tradingview(matched_pairs, binance_base_currency, type)
 
-def get_and_save_ccxt_pairs(exchange_id='binance', base_currency='USDT', type='swap', use_existing_binance=True):
+def get_and_save_ccxt_pairs(exchange_id='binance', base_currency='USDT', type='swap', use_existing_binance=True,
+                           markets=None, binance_pairs=None):
     """
     Retrieves and saves pairs for a specific exchange using ccxt.
     If use_existing_binance is True and exchange is not Binance, it will filter pairs against existing Binance pairs.
@@ -319,50 +381,86 @@ def get_and_save_ccxt_pairs(exchange_id='binance', base_currency='USDT', type='s
         base_currency (str): The base currency to process (e.g., 'USDT', 'USDC', 'FDUSD').
         type (str): The type of pairs ('swap' for perpetual or 'spot' for spot).
         use_existing_binance (bool): Whether to filter pairs against existing Binance pairs.
+        markets (dict, optional): Markets already loaded for the exchange.
+        binance_pairs (list or SymbolTable, optional): Binance pairs to filter against.
+                                                       If not provided, they are loaded from the saved Binance file.
 
     Returns:
-        list: A list of pairs retrieved from the exchange.
+        SymbolTable: The symbols retrieved from the exchange.
     """
     print(f"Getting {exchange_id} {base_currency} {type} pairs...")
-    pairs = get_ccxt_pairs(exchange_id, base_currency, type)
+    pairs = SymbolTable.from_pairs(exchange_id, get_ccxt_pairs(exchange_id, base_currency, type, markets), type)
     print(f"{exchange_id} {base_currency} {type} pairs: {len(pairs)} found")
 
     if use_existing_binance and exchange_id.lower() != 'binance':
         # Filter against Binance pairs
-        binance_pairs = load_pairs_from_file(base_currency, type)
-        if binance_pairs:
+        if binance_pairs is None:
+            binance_pairs = load_symbol_table(base_currency, type)
+        elif not isinstance(binance_pairs, SymbolTable):
+            binance_pairs = SymbolTable.from_pairs('binance', binance_pairs, type)
+        if len(binance_pairs):
             print(f"Filtering {exchange_id} pairs against Binance pairs...")
-            filtered_pairs = []
-            missing_pairs = []
-
-            for pair in pairs:
-                coin = pair.split('/')[0]
-                found = False
-                for binance_pair in binance_pairs:
-                    if binance_pair.split('/')[0] == coin:
-                        filtered_pairs.append(pair)
-                        found = True
-                        break
-
-                if not found:
-                    missing_pairs.append(pair)
+            with metrics.span('match', source=exchange_id, target='binance') as record:
+                binance_normalized = binance_pairs.by_coin
+                filtered_pairs = []
+                missing_pairs = []
+
+                for symbol in pairs:
+                    if symbol.coin in binance_normalized:
+                        filtered_pairs.append(symbol)
+                    else:
+                        missing_pairs.append(symbol)
+                record['items'] = len(pairs)
 
             # Print missing pairs
             if missing_pairs:
                 print(f"\nPairs in {exchange_id} but not in Binance {type} {base_currency}:")
-                for pair in missing_pairs:
-                    print(f"  {pair}")
+                for symbol in missing_pairs:
+                    print(f"  {symbol.ccxt_symbol}")
 
             print(f"Found {len(filtered_pairs)} pairs that exist in both {exchange_id} and Binance")
             print(f"Found {len(missing_pairs)} pairs that exist only in {exchange_id}")
 
-            pairs = filtered_pairs
+            pairs = SymbolTable(exchange_id, filtered_pairs)
 
     if pairs:
         save_pairs_for_tradingview(pairs, exchange_id, base_currency, type)
 
     return pairs
 
+def get_and_save_multi_exchange_pairs(exchange_ids, base_currency='USDT', type='swap', use_existing_binance=True,
+                                      markets_by_exchange=None):
+    """
+    Retrieves and saves pairs for several exchanges, loading their markets concurrently.
+    Matching and file writes then run from the in-memory markets.
+
+    Args:
+        exchange_ids (list): The ccxt exchange IDs (e.g., ['binance', 'bybit', 'okx']).
+        base_currency (str): The base currency to process (e.g., 'USDT').
+        type (str): The type of pairs ('swap' for perpetual or 'spot' for spot).
+        use_existing_binance (bool): Whether to filter non-Binance pairs against Binance pairs.
+        markets_by_exchange (dict, optional): Markets already returned by load_markets_concurrently.
+
+    Returns:
+        dict: A mapping of exchange ID to the saved SymbolTable, for the exchanges that loaded.
+    """
+    if markets_by_exchange is None:
+        markets_by_exchange, timings, failures = load_markets_concurrently(exchange_ids)
+
+    # Filter against the in-memory Binance symbols when Binance was loaded in the same batch
+    binance_pairs = None
+    if 'binance' in markets_by_exchange:
+        binance_pairs = SymbolTable.from_markets('binance', markets_by_exchange['binance'], base_currency, type)
+
+    results = {}
+    for exchange_id in exchange_ids:
+        if exchange_id not in markets_by_exchange:
+            continue
+        results[exchange_id] = get_and_save_ccxt_pairs(exchange_id, base_currency, type, use_existing_binance,
+                                                       markets_by_exchange[exchange_id], binance_pairs)
+
+    return results
+
 # Example usage
 if __name__ == "__main__":
     # Get pairs from Hyperliquid (USDC) and match with Binance (USDT)
@@ -375,3 +473,6 @@ if __name__ == "__main__":
     # get_and_save_ccxt_pairs('binance', 'USDT', 'swap')
     # get_and_save_ccxt_pairs('bybit', 'USDT', 'swap', use_existing_binance=True)
     # get_and_save_ccxt_pairs('okx', 'USDT', 'swap', use_existing_binance=True)
+
+    # Load several exchanges concurrently and save all of their pairs
+    # get_and_save_multi_exchange_pairs(['binance', 'bybit', 'okx'], 'USDT', 'swap')
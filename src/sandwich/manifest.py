@@ -0,0 +1,203 @@
+"""
+Content-hash manifest of generated files.
+
+Each entry records the hash of a generated file and a fingerprint of the
+inputs that produced it, so unchanged steps can be skipped and unchanged
+outputs are never rewritten.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+
+from sandwich import metrics
+from sandwich.fileutil import atomic_write
+
+MANIFEST_FILE = '.sandwich_manifest.json'
+
+# Entries collected by deferred_entries() instead of being saved one at a time
+pending = None
+
+def content_hash(data):
+    """
+    Returns the SHA-256 hex digest of a string or bytes.
+
+    Args:
+        data (str or bytes): The content to hash.
+
+    Returns:
+        str: The hex digest.
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(data).hexdigest()
+
+def file_hash(path):
+    """
+    Returns the SHA-256 hex digest of a file's content.
+
+    Args:
+        path (str): The file path.
+
+    Returns:
+        str: The hex digest, or None if the file does not exist.
+    """
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+    except FileNotFoundError:
+        return None
+
+def fingerprint(inputs):
+    """
+    Returns a stable hash of an inputs mapping.
+
+    Args:
+        inputs (dict): JSON serializable values describing the inputs of a step.
+
+    Returns:
+        str: The hex digest.
+    """
+    return content_hash(json.dumps(inputs, sort_keys=True, separators=(',', ':')))
+
+def load_manifest(manifest_file=MANIFEST_FILE):
+    """
+    Loads the manifest.
+
+    Args:
+        manifest_file (str): The manifest path.
+
+    Returns:
+        dict: A mapping of output path to its entry, empty if there is no manifest yet.
+    """
+    try:
+        with open(manifest_file, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_manifest(manifest, manifest_file=MANIFEST_FILE):
+    """
+    Atomically saves the manifest.
+
+    Args:
+        manifest (dict): The manifest to save.
+        manifest_file (str): The manifest path.
+
+    Returns:
+        None
+    """
+    atomic_write(manifest_file, json.dumps(manifest, indent=2, sort_keys=True))
+
+def is_up_to_date(path, inputs, manifest_file=MANIFEST_FILE):
+    """
+    Checks whether a generated file was produced from the same inputs and is unmodified.
+
+    Args:
+        path (str): The generated file path.
+        inputs (dict): The inputs the step would use now.
+        manifest_file (str): The manifest path.
+
+    Returns:
+        bool: True if the step can be skipped.
+    """
+    entry = load_manifest(manifest_file).get(path)
+    return (entry is not None
+            and entry.get('inputs') == fingerprint(inputs)
+            and entry.get('hash') == file_hash(path))
+
+def write_output(path, content, inputs=None, manifest_file=MANIFEST_FILE, summarize=True):
+    """
+    Writes a generated file only if its content changed, and records it in the manifest.
+
+    Changed files are written atomically and a summary of added and removed
+    lines (symbols) is printed.
+
+    Args:
+        path (str): The generated file path.
+        content (str or bytes): The new file content. Bytes are written as is, without a summary.
+        inputs (dict, optional): The inputs that produced the content.
+        manifest_file (str): The manifest path.
+        summarize (bool): Whether to print the added and removed lines of a changed text file.
+
+    Returns:
+        bool: True if the file was written, False if it was already up to date.
+    """
+    new_hash = content_hash(content)
+    old_hash = file_hash(path)
+    changed = new_hash != old_hash
+
+    if changed and (not summarize or isinstance(content, bytes)):
+        atomic_write(path, content, 'wb' if isinstance(content, bytes) else 'w')
+        metrics.incr('files_written_total')
+        print(f"{path}: written")
+    elif changed:
+        old_lines = []
+        if old_hash is not None:
+            with open(path, 'r') as f:
+                old_lines = f.read().splitlines()
+        new_lines = content.splitlines()
+        old_set = set(old_lines)
+        new_set = set(new_lines)
+        added = [line for line in new_lines if line not in old_set]
+        removed = [line for line in old_lines if line not in new_set]
+
+        atomic_write(path, content)
+        metrics.incr('files_written_total')
+
+        print(f"{path}: {len(added)} added, {len(removed)} removed")
+        # list individual symbols only for files that already existed
+        if old_hash is not None:
+            for line in added:
+                print(f"  + {line}")
+            for line in removed:
+                print(f"  - {line}")
+    else:
+        metrics.incr('files_unchanged_total')
+        print(f"{path}: unchanged")
+
+    entry = {'hash': new_hash}
+    if inputs is not None:
+        entry['inputs'] = fingerprint(inputs)
+    if pending is not None:
+        pending.setdefault(manifest_file, {})[path] = entry
+    else:
+        save_entries({path: entry}, manifest_file)
+
+    return changed
+
+def save_entries(entries, manifest_file=MANIFEST_FILE):
+    """
+    Records manifest entries, saving the manifest only if one of them changed.
+
+    Args:
+        entries (dict): A mapping of output path to its entry.
+        manifest_file (str): The manifest path.
+
+    Returns:
+        None
+    """
+    manifest = load_manifest(manifest_file)
+    if any(manifest.get(path) != entry for path, entry in entries.items()):
+        manifest.update(entries)
+        save_manifest(manifest, manifest_file)
+
+@contextlib.contextmanager
+def deferred_entries():
+    """
+    Collects the entries recorded by write_output instead of saving the manifest.
+
+    Used by worker processes, which must not rewrite the shared manifest
+    concurrently: the collected entries are handed to the parent, which
+    records them all with save_entries.
+
+    Yields:
+        dict: A mapping of manifest path to the {output path: entry} collected for it.
+    """
+    global pending
+    previous, pending = pending, {}
+    try:
+        yield pending
+    finally:
+        pending = previous
@@ -0,0 +1,169 @@
+"""
+Lightweight per-stage timing and counters for the pipeline.
+
+Stages are recorded with the span() context manager and counters with incr().
+At the end of a run the collected metrics can be written as JSON lines or as
+a Prometheus textfile (for the node_exporter textfile collector).
+"""
+
+import contextlib
+import json
+import threading
+import time
+
+from sandwich.fileutil import atomic_write
+
+lock = threading.Lock()
+spans = []
+counters = {}
+
+def reset():
+    """
+    Clears all recorded spans and counters.
+    """
+    with lock:
+        spans.clear()
+        counters.clear()
+
+def incr(name, value=1):
+    """
+    Increments a counter.
+
+    Args:
+        name (str): The counter name (e.g., 'http_requests_total').
+        value (int): The amount to add.
+    """
+    with lock:
+        counters[name] = counters.get(name, 0) + value
+
+@contextlib.contextmanager
+def span(stage, **labels):
+    """
+    Times a pipeline stage.
+
+    The yielded dict can be updated inside the block, e.g. record['items'] = n
+    for the number of items the stage processed.
+
+    Args:
+        stage (str): The stage name (e.g., 'load_markets', 'sort').
+        **labels: Extra labels identifying the stage (e.g., exchange='binance').
+
+    Yields:
+        dict: The span record.
+    """
+    record = {'stage': stage, **labels}
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['wall_seconds'] = time.perf_counter() - start
+        with lock:
+            spans.append(record)
+
+def record(stage, wall_seconds, **labels):
+    """
+    Records a stage timed elsewhere, e.g. in a worker thread.
+
+    Args:
+        stage (str): The stage name.
+        wall_seconds (float): The measured duration.
+        **labels: Extra labels identifying the stage.
+    """
+    with lock:
+        spans.append({'stage': stage, **labels, 'wall_seconds': wall_seconds})
+
+def snapshot():
+    """
+    Returns a copy of the recorded spans and counters.
+
+    Returns:
+        tuple: The list of span records and the dict of counters.
+    """
+    with lock:
+        return [dict(record) for record in spans], dict(counters)
+
+def merge(other_spans, other_counters):
+    """
+    Adds spans and counters recorded elsewhere, e.g. in a worker process.
+
+    Args:
+        other_spans (list): The span records returned by snapshot().
+        other_counters (dict): The counters returned by snapshot().
+    """
+    with lock:
+        spans.extend(other_spans)
+        for name, value in other_counters.items():
+            counters[name] = counters.get(name, 0) + value
+
+def to_jsonl(run_started=None):
+    """
+    Renders the metrics as JSON lines, one line per span and one per counter.
+
+    Args:
+        run_started (float, optional): The run start timestamp added to every line.
+
+    Returns:
+        str: The JSON lines.
+    """
+    run_spans, run_counters = snapshot()
+    run = run_started or time.time()
+    lines = [json.dumps({'type': 'span', 'run': run, **record}) for record in run_spans]
+    lines += [json.dumps({'type': 'counter', 'run': run, 'name': name, 'value': value})
+              for name, value in sorted(run_counters.items())]
+    return ''.join(line + '\n' for line in lines)
+
+def prometheus_labels(record):
+    """
+    Formats the labels of a span record for the Prometheus text format.
+    """
+    labels = {key: value for key, value in record.items() if key not in ('wall_seconds', 'items')}
+    escaped = {key: str(value).replace('\\', '\\\\').replace('"', '\\"') for key, value in labels.items()}
+    return ','.join(f'{key}="{value}"' for key, value in sorted(escaped.items()))
+
+def to_prometheus():
+    """
+    Renders the metrics in the Prometheus text exposition format.
+    Spans sharing the same labels are summed.
+
+    Returns:
+        str: The textfile content.
+    """
+    run_spans, run_counters = snapshot()
+    durations = {}
+    items = {}
+    for record in run_spans:
+        labels = prometheus_labels(record)
+        durations[labels] = durations.get(labels, 0) + record['wall_seconds']
+        if 'items' in record:
+            items[labels] = items.get(labels, 0) + record['items']
+
+    out = ['# HELP sandwich_stage_duration_seconds Wall time spent in each pipeline stage.',
+           '# TYPE sandwich_stage_duration_seconds gauge']
+    out += [f'sandwich_stage_duration_seconds{{{labels}}} {value:.6f}' for labels, value in durations.items()]
+    out += ['# HELP sandwich_stage_items Items processed by each pipeline stage.',
+            '# TYPE sandwich_stage_items gauge']
+    out += [f'sandwich_stage_items{{{labels}}} {value}' for labels, value in items.items()]
+    for name, value in sorted(run_counters.items()):
+        out += [f'# TYPE sandwich_{name} counter', f'sandwich_{name} {value}']
+    out.append(f'sandwich_last_run_timestamp_seconds {time.time():.0f}')
+    return '\n'.join(out) + '\n'
+
+def write(path, run_started=None):
+    """
+    Writes the metrics to a file.
+
+    Files ending in '.prom' are atomically replaced with Prometheus textfile
+    output; any other path gets the run appended as JSON lines.
+
+    Args:
+        path (str): The metrics file path.
+        run_started (float, optional): The run start timestamp for JSON lines output.
+
+    Returns:
+        None
+    """
+    if path.endswith('.prom'):
+        atomic_write(path, to_prometheus())
+    else:
+        with open(path, 'a') as f:
+            f.write(to_jsonl(run_started))
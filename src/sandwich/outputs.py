@@ -0,0 +1,182 @@
+"""
+Export stage rendering every output format of a list from the lines in memory.
+
+The .txt list read back by the later stages and imported into TradingView is
+always written. Extra formats are rendered from the same lines in one pass:
+a TradingView watchlist grouped into ###Top N sections, CSV and JSON, each
+optionally gzipped for archival. Every file is written atomically, only when
+its content changed, and recorded in the manifest.
+"""
+
+import csv
+import gzip
+import io
+import json
+
+from sandwich import manifest
+
+FORMATS = ('sections', 'csv', 'json')
+EXTENSIONS = {'txt': '.txt', 'sections': '.sections.txt', 'csv': '.csv', 'json': '.json'}
+DEFAULT_SECTIONS = (50, 100, 200)
+
+settings = {
+    'formats': (),
+    'sections': DEFAULT_SECTIONS,
+    'gzip': False,
+}
+
+def configure(formats=None, sections=None, gzip=None):
+    """
+    Updates the outputs written next to every .txt list.
+
+    Args:
+        formats (iterable, optional): Extra formats from FORMATS.
+        sections (iterable, optional): The rank boundaries of the ###Top N sections.
+        gzip (bool, optional): Whether to gzip the extra formats.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If a format is unknown.
+    """
+    if formats is not None:
+        unknown = [fmt for fmt in formats if fmt not in FORMATS]
+        if unknown:
+            raise ValueError(f"Unknown output format: {', '.join(unknown)}")
+        settings['formats'] = tuple(dict.fromkeys(formats))
+    if sections is not None:
+        settings['sections'] = tuple(sorted(sections))
+    if gzip is not None:
+        settings['gzip'] = gzip
+
+def output_paths(path, ranked=True):
+    """
+    Returns the file of every configured format of a list.
+
+    Args:
+        path (str): The .txt list (e.g., 'sorted_usdt_swap.txt').
+        ranked (bool): Whether the list is ranked. Sections are only written for ranked lists.
+
+    Returns:
+        dict: Format to file path, starting with 'txt'.
+    """
+    stem = path[:-4] if path.endswith('.txt') else path
+    paths = {'txt': path}
+    for fmt in settings['formats']:
+        if fmt == 'sections' and not ranked:
+            continue
+        paths[fmt] = stem + EXTENSIONS[fmt] + ('.gz' if settings['gzip'] else '')
+    return paths
+
+def format_inputs(fmt, inputs):
+    """
+    Returns the manifest inputs of one format of a list.
+    """
+    if fmt == 'txt':
+        return inputs
+    return {**(inputs or {}), 'format': fmt, 'sections': settings['sections'] if fmt == 'sections' else None}
+
+def records(lines, matched=None):
+    """
+    Splits TradingView lines into rows.
+
+    Args:
+        lines (list): The TradingView lines.
+        matched (int, optional): The number of ranked lines at the start of the list.
+
+    Yields:
+        tuple: The rank (None for unranked lines), TradingView id, exchange and symbol.
+    """
+    for position, line in enumerate(lines):
+        exchange, _, symbol = line.rpartition(':')
+        rank = position + 1 if matched is None or position < matched else None
+        yield rank, line, exchange, symbol
+
+def render_sections(lines, matched):
+    """
+    Renders a TradingView watchlist grouped by rank: ###Top 50, ###Top 100, ..., then the rest.
+    """
+    out = []
+    start = 0
+    for bound in settings['sections']:
+        end = min(bound, matched)
+        if start < end:
+            out.append(f'###Top {bound}')
+            out += lines[start:end]
+            start = end
+    if start < matched:
+        out.append('###Ranked')
+        out += lines[start:matched]
+    if matched < len(lines):
+        out.append('###Unranked')
+        out += lines[matched:]
+    return ''.join(line + '\n' for line in out)
+
+def render(fmt, lines, matched=None):
+    """
+    Renders a list in one format.
+
+    Args:
+        fmt (str): 'txt' or one of FORMATS.
+        lines (list): The TradingView lines, in list order.
+        matched (int, optional): The number of ranked lines at the start of the list.
+
+    Returns:
+        str: The file content.
+    """
+    if fmt == 'txt':
+        return ''.join(line + '\n' for line in lines)
+    if fmt == 'sections':
+        return render_sections(lines, len(lines) if matched is None else matched)
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(('rank', 'tradingview_id', 'exchange', 'symbol'))
+        writer.writerows(records(lines, matched))
+        return buffer.getvalue()
+    if fmt == 'json':
+        keys = ('rank', 'tradingview_id', 'exchange', 'symbol')
+        return json.dumps([dict(zip(keys, record)) for record in records(lines, matched)], indent=2) + '\n'
+    raise ValueError(f"Unknown output format: {fmt}")
+
+def is_up_to_date(path, inputs, ranked=True):
+    """
+    Checks whether every configured output of a list was produced from the same inputs.
+
+    Args:
+        path (str): The .txt list.
+        inputs (dict): The inputs the step would use now.
+        ranked (bool): Whether the list is ranked.
+
+    Returns:
+        bool: True if the step can be skipped.
+    """
+    return all(manifest.is_up_to_date(out_path, format_inputs(fmt, inputs))
+               for fmt, out_path in output_paths(path, ranked).items())
+
+def write_list(path, lines, inputs=None, matched=None):
+    """
+    Writes a list in every configured format.
+
+    Args:
+        path (str): The .txt list (e.g., 'sorted_usdt_swap.txt').
+        lines (list): The TradingView lines, in list order.
+        inputs (dict, optional): The inputs that produced the lines.
+        matched (int, optional): The number of ranked lines at the start of the list.
+                                 None for lists that are not ranked.
+
+    Returns:
+        bool: True if the .txt list was written, False if it was already up to date.
+    """
+    changed = False
+    for fmt, out_path in output_paths(path, matched is not None).items():
+        content = render(fmt, lines, matched)
+        if fmt == 'txt':
+            changed = manifest.write_output(out_path, content, inputs)
+            continue
+        if out_path.endswith('.gz'):
+            # no timestamp in the header, so unchanged content compresses to the same bytes
+            content = gzip.compress(content.encode(), mtime=0)
+        manifest.write_output(out_path, content, format_inputs(fmt, inputs), summarize=False)
+    return changed
@@ -0,0 +1,78 @@
+"""
+Memory-mapped reader for TradingView pair files.
+
+The file is mapped instead of read, and EXCHANGE:SYMBOL lines are found with a
+compiled pattern scanning the bytes directly. Only the base coin of a matching
+line is decoded, so no string is allocated for lines that are skipped or for
+the prefix and suffix around the coin.
+"""
+
+import contextlib
+import mmap
+import re
+
+@contextlib.contextmanager
+def mapped(path):
+    """
+    Maps a file read-only.
+
+    Args:
+        path (str): The file path.
+
+    Yields:
+        mmap.mmap or bytes: The mapped content (empty bytes for an empty file).
+    """
+    with open(path, 'rb') as f:
+        # empty files cannot be mapped
+        if not f.seek(0, 2):
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield buf
+
+def line_pattern(exchange, quote, market_type):
+    """
+    Compiles the pattern matching the lines of one exchange and quote currency.
+
+    Mirrors Symbol.from_tradingview: the exchange prefix is case-insensitive, a
+    'PERP' suffix is optional for swaps and the base coin must not be empty.
+
+    Args:
+        exchange (str): The exchange prefix (e.g., 'BINANCE').
+        quote (str): The quote currency (e.g., 'USDT').
+        market_type (str): The market type ('swap' or 'spot').
+
+    Returns:
+        re.Pattern: A multiline bytes pattern whose first group is the base coin.
+    """
+    perp = rb'(?:PERP)?' if market_type == 'swap' else b''
+    return re.compile(rb'^[ \t]*(?i:' + re.escape(exchange.encode()) + rb'):(\S+)' + re.escape(quote.encode())
+                      + perp + rb'[ \t\r]*$', re.MULTILINE)
+
+def iter_bases(path, exchange, quote, market_type):
+    """
+    Yields the base coins of the lines of one exchange and quote currency, in file order.
+
+    Args:
+        path (str): The pairs file.
+        exchange (str): The exchange prefix (e.g., 'BINANCE').
+        quote (str): The quote currency (e.g., 'USDT').
+        market_type (str): The market type ('swap' or 'spot').
+
+    Yields:
+        str: The base coins (e.g., 'BTC', '1000PEPE').
+    """
+    pattern = line_pattern(exchange, quote, market_type)
+    with mapped(path) as buf:
+        for match in pattern.finditer(buf):
+            yield match.group(1).decode()
+
+def read_lines(path):
+    """
+    Reads the lines of a pairs file with one copy out of the mapping.
+
+    Returns:
+        list: The lines, without line endings.
+    """
+    with mapped(path) as buf:
+        return buf[:].decode().splitlines()
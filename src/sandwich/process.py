@@ -1,4 +1,8 @@
+import heapq
 import json
+from itertools import islice
+
+from sandwich import aliases, manifest, metrics, outputs, pairfile
 
 def remove_prefix_suffix(s):
     """
@@ -16,6 +20,8 @@ def remove_prefix_suffix(s):
         s = s[:-4]
     return s
 
+EXCLUDED_CURRENCIES = ('USDC', 'FDUSD', 'EUR')
+
 def find_symbol_in_lines(item, lines, base_currency='USDT'):
     """
     Finds the symbol in the list of lines.
@@ -28,15 +34,182 @@ def find_symbol_in_lines(item, lines, base_currency='USDT'):
     Returns:
         str: The line containing the symbol, or an empty string if the symbol is not found.
     """
-    excluded_currencies = ['USDC', 'FDUSD', 'EUR']
-    for line in lines:
-        symbol = item["symbol"].upper() + base_currency
-        symbol_in_line = remove_prefix_suffix(line)
-        if not any(symbol == f'{curr}{base_currency}' for curr in excluded_currencies) and (symbol == symbol_in_line or ('1000' + symbol) == symbol_in_line):
-            return line
-    return ''
+    return lookup_symbol(item, build_symbol_index(lines, base_currency))
+
+def build_symbol_index(lines, base_currency='USDT', table=None):
+    """
+    Builds an index of canonical coins to lines in a single pass.
+
+    The key is the canonical coin of the line (see aliases.AliasTable.line_coin),
+    e.g. 'BINANCE:1000PEPEUSDTPERP' -> 'PEPE'. Only the first line for each
+    coin is kept, matching the first-match semantics of a linear scan.
+
+    Args:
+        lines (list): A list of strings in TradingView format.
+        base_currency (str): The base currency of the lines (e.g., 'USDT').
+        table (AliasTable, optional): The alias table. Defaults to the installed one.
+
+    Returns:
+        dict: A mapping of canonical coin to (position, line).
+    """
+    table = table or aliases.active
+    index = {}
+    for position, (line, coin) in enumerate(zip(lines, table.line_coins(lines, base_currency))):
+        if coin is not None:
+            index.setdefault(coin, (position, line))
+    return index
+
+def lookup_symbol(item, index, table=None):
+    """
+    Looks up a CoinGecko item in an index built by build_symbol_index.
+
+    The item's symbol is resolved to its canonical coin, so '1000' and 'k'
+    prefixed lines and renamed tickers match with one lookup. Items whose
+    symbol belongs to another coin with a better market cap rank do not match.
+
+    Args:
+        item (dict): The CoinGecko market data item.
+        index (dict): The index returned by build_symbol_index.
+        table (AliasTable, optional): The alias table. Defaults to the installed one.
+
+    Returns:
+        str: The matching line, or an empty string if the symbol is not found.
+    """
+    table = table or aliases.active
+    coin = table.canonical(item["symbol"].upper())
+    if coin in EXCLUDED_CURRENCIES or not table.owns(coin, item.get("id")):
+        return ''
+    match = index.get(coin)
+    return match[1] if match else ''
+
+def iter_json_array(f, chunk_size=65536):
+    """
+    Incrementally parses a top-level JSON array, yielding one item at a time.
+
+    Only the current chunk and the item being decoded are held in memory, so
+    large CoinGecko dumps can be processed without loading the whole file.
+
+    Args:
+        f (file): A text file object positioned at the start of the array.
+        chunk_size (int): The number of characters read per chunk.
+
+    Yields:
+        object: Each decoded array item.
+
+    Raises:
+        ValueError: If the file does not contain a JSON array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    started = False
+
+    while True:
+        # skip whitespace and separators, reading more data when needed
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            buffer = f.read(chunk_size)
+            pos = 0
+            eof = not buffer
+
+        if pos >= len(buffer):
+            raise ValueError('Unexpected end of JSON array')
+
+        if not started:
+            if buffer[pos] != '[':
+                raise ValueError('Expected a JSON array')
+            started = True
+            pos += 1
+            continue
+
+        if buffer[pos] == ']':
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+            # a value must be followed by ',' or ']', otherwise it may be
+            # truncated at the chunk edge (e.g. '1.5' of '1.5e10')
+            after = end
+            while after < len(buffer) and buffer[after] in ' \t\r\n':
+                after += 1
+            if after == len(buffer) or buffer[after] not in ',]':
+                raise json.JSONDecodeError('Item may continue in next chunk', buffer, end)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        yield item
+        pos = end
+
+def volume_key(item):
+    """
+    Returns the total volume of a market data item, treating missing volume as 0.
+
+    Args:
+        item (dict): The CoinGecko market data item.
+
+    Returns:
+        float: The total volume.
+    """
+    return item.get("total_volume") or 0
+
+def load_market_data(json_file='marketcap.json', limit=500, top_k=None):
+    """
+    Loads CoinGecko market data saved by save_market_data.
+
+    The file is parsed incrementally. With top_k, only the top_k items by
+    total_volume are kept in a heap, so memory stays bounded however large
+    the input is.
+
+    Args:
+        json_file (str): The market data file to read.
+        limit (int, optional): The number of top market cap coins to consider.
+                               None considers every coin in the file.
+        top_k (int, optional): The number of highest volume coins to keep.
+                               None keeps every considered coin.
+
+    Returns:
+        list: The market data items, sorted by total_volume descending when top_k is given.
+    """
+    with metrics.span('load_market_data') as record, open(json_file, 'r') as f:
+        items = iter_json_array(f)
+        if limit is not None:
+            items = islice(items, limit)
+        if top_k is not None:
+            items = heapq.nlargest(top_k, items, key=volume_key)
+        mcap = list(items)
+        record['items'] = len(mcap)
+        return mcap
+
+def list_file_names(base_currency, market_type, is_hyperliquid=False):
+    """
+    Returns the pairs file and sorted file names for a list.
+
+    Args:
+        base_currency (str): The base currency (e.g., 'USDT', 'USDC').
+        market_type (str): The type of market ('swap' or 'spot').
+        is_hyperliquid (bool): Whether the list holds Hyperliquid-matched pairs.
+
+    Returns:
+        tuple: The pairs file name and the sorted file name.
+    """
+    # Determine file names based on whether we're sorting Hyperliquid pairs
+    if is_hyperliquid:
+        return (f'{base_currency.lower()}_{market_type}_hype_pairs.txt',
+                f'sorted_{base_currency.lower()}_{market_type}_hype.txt')
+    return (f'{base_currency.lower()}_{market_type}_pairs.txt',
+            f'sorted_{base_currency.lower()}_{market_type}.txt')
 
-def sort_market_data(base_currency, market_type, is_hyperliquid=False):
+def sort_market_data(base_currency, market_type, is_hyperliquid=False, mcap=None, ranking=None):
     """
     Sorts market data based on symbol and market cap rank.
 
@@ -44,62 +217,48 @@ def sort_market_data(base_currency, market_type, is_hyperliquid=False):
         base_currency (str): The base currency to use (e.g., 'USDT', 'USDC').
         market_type (str): The type of market ('swap' or 'spot').
         is_hyperliquid (bool): Whether to sort Hyperliquid pairs data.
+        mcap (list, optional): Market data already returned by load_market_data, ranked by volume.
+                               If not provided, it is read from 'marketcap.json'.
+        ranking (Ranking, optional): A ranking.Ranking built once and shared by every
+                                     list. Takes precedence over mcap.
 
     Returns:
-        None
+        list: The sorted lines.
     """
-    # open json file
-    json_file = 'marketcap.json'
+    txt_file, sorted_file = list_file_names(base_currency, market_type, is_hyperliquid)
 
-    # Determine file names based on whether we're sorting Hyperliquid pairs
-    if is_hyperliquid:
-        txt_file = f'{base_currency.lower()}_{market_type}_hype_pairs.txt'
-        sorted_file = f'sorted_{base_currency.lower()}_{market_type}_hype.txt'
-    else:
-        txt_file = f'{base_currency.lower()}_{market_type}_pairs.txt'
-        sorted_file = f'sorted_{base_currency.lower()}_{market_type}.txt'
-
-    with open(json_file, 'r') as f:
-        # read file
-        data = f.read()
-        # parse file
-        mcap = json.loads(data)[0:500]
-
-        # open txt file
-        with open(txt_file, 'r') as g:
-            data = g.read()
+    if ranking is None:
+        from sandwich.ranking import Ranking
+        ranking = Ranking(load_market_data() if mcap is None else mcap)
+
+    with metrics.span('sort', list=sorted_file) as record:
+        # Skip the step entirely when neither the pairs nor the volume ranking changed.
+        # The mapped file is hashed first, so a skipped step never decodes its lines.
+        with pairfile.mapped(txt_file) as buf:
+            inputs = {
+                'pairs': manifest.content_hash(buf),
+                'base_currency': base_currency,
+                'ranking': ranking.fingerprint,
+            }
+            up_to_date = outputs.is_up_to_date(sorted_file, inputs)
             # split the data into a list of lines
-            lines = data.splitlines()
-
-            sorted_data = ''
-            # Sort market data by total_volume descending
-            mcap_sorted = sorted(mcap, key=lambda x: x["total_volume"], reverse=True)
-
-            sorted_symbols = set()
-            for i in mcap_sorted:
-                # total_volume = int(i["total_volume"]) if isinstance(i["total_volume"], (float, str)) else i["total_volume"]
-                # print(f'{i["symbol"]} - {i["market_cap_rank"]} - {total_volume}')
-
-                # find the symbol in the list of lines
-                line = find_symbol_in_lines(i, lines, base_currency)
-                if line:
-                    sorted_data += line + '\n'
-                    sorted_symbols.add(line)
-
-            # print the number of lines
-            print(f'{len(sorted_data.splitlines())} lines')
-
-            # Append unsorted pairs
-            unsorted_count = 0
-            for line in lines:
-                if line not in sorted_symbols:
-                    sorted_data += line + '\n'
-                    unsorted_count += 1
-            print(f'Number of unsorted symbols: {unsorted_count}')
-
-            # write the sorted data back to a new file
-            with open(sorted_file, 'w') as h:
-                h.write(sorted_data)
+            lines = None if up_to_date else buf[:].decode().splitlines()
+
+        if up_to_date:
+            metrics.incr('steps_skipped_total')
+            print(f'{sorted_file} is up to date')
+            with open(sorted_file, 'r') as h:
+                return h.read().splitlines()
+        record['items'] = len(lines)
+
+        sorted_lines, matched = ranking.order_lines(lines, base_currency)
+        print(f'{matched} lines')
+        print(f'Number of unsorted symbols: {len(sorted_lines) - matched}')
+
+        # write the sorted data back to a new file and its extra formats, only if they changed
+        outputs.write_list(sorted_file, sorted_lines, inputs, matched)
+
+        return sorted_lines
 
 # download_file(url, file_path)
 
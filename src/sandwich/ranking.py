@@ -0,0 +1,290 @@
+"""
+Ranking engine shared by every sorted list of a run.
+
+The market data is ranked once: symbols and sort scores are loaded into arrays,
+ordered with a single stable argsort, resolved to canonical coins and the
+excluded currencies are dropped. Each pairs list is then ordered with a lookup
+of the ranked coins in the list's keys and one gather. NumPy is used when it
+is installed; otherwise the same ranking runs in pure Python and produces
+identical output.
+
+TickerRanking orders the lists by the exchange's own tickers instead, so no
+CoinGecko data is needed.
+"""
+
+import json
+
+from sandwich import aliases, cache, manifest
+from sandwich.process import EXCLUDED_CURRENCIES, build_symbol_index, volume_key
+from sandwich.symbols import tradingview_id
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SORT_KEYS = ('volume', 'market_cap', 'volume_mcap', 'blend')
+# Sort keys ranked from exchange tickers rather than CoinGecko data
+EXCHANGE_SORT_KEYS = ('exchange_volume', 'open_interest')
+
+DEFAULT_WEIGHTS = {'volume': 0.5, 'market_cap': 0.3, 'volume_mcap': 0.2}
+
+def parse_weights(weights):
+    """
+    Parses blend weights such as 'volume=0.6,market_cap=0.4'.
+
+    Args:
+        weights (str): Comma-separated key=weight items.
+
+    Returns:
+        dict: The weight of each sort key.
+
+    Raises:
+        ValueError: If a key is unknown or a weight is not a number.
+    """
+    parsed = {}
+    for item in weights.split(','):
+        if not item.strip():
+            continue
+        key, _, value = item.partition('=')
+        key = key.strip()
+        if key not in DEFAULT_WEIGHTS:
+            raise ValueError(f"Unknown blend key: {key}")
+        parsed[key] = float(value)
+    return parsed
+
+def market_cap_key(item):
+    """
+    Returns the market cap of a market data item, treating a missing market cap as 0.
+    """
+    return item.get("market_cap") or 0
+
+def stable_order(values):
+    """
+    Returns the indices of values sorted descending, ties keeping their original order.
+    """
+    if np is not None:
+        return np.argsort(-np.asarray(values, dtype=float), kind='stable')
+    return sorted(range(len(values)), key=lambda i: -values[i])
+
+def percentile_scores(values):
+    """
+    Scores values by their descending rank, from 1.0 for the highest down towards 0.
+    """
+    n = len(values)
+    order = stable_order(values)
+    if np is not None:
+        scores = np.empty(n)
+        scores[order] = 1.0 - np.arange(n) / n
+        return scores.tolist()
+    scores = [0.0] * n
+    for position, i in enumerate(order):
+        scores[i] = 1.0 - position / n
+    return scores
+
+def score_values(mcap, sort_key='volume', weights=None):
+    """
+    Computes the score each coin is ranked by.
+
+    Args:
+        mcap (list): The market data items returned by load_market_data.
+        sort_key (str): 'volume' (24h volume), 'market_cap', 'volume_mcap' (volume
+                        to market cap ratio) or 'blend' (weighted rank blend of the three).
+        weights (dict, optional): The blend weights. Defaults to DEFAULT_WEIGHTS.
+
+    Returns:
+        list: One score per coin, higher ranks first.
+    """
+    if sort_key not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort_key}")
+    if sort_key == 'volume':
+        return [volume_key(i) for i in mcap]
+    if sort_key == 'market_cap':
+        return [market_cap_key(i) for i in mcap]
+    ratios = [volume_key(i) / market_cap_key(i) if market_cap_key(i) else 0.0 for i in mcap]
+    if sort_key == 'volume_mcap':
+        return ratios
+
+    # Raw values differ by orders of magnitude, so the blend weighs ranks instead
+    weights = weights or DEFAULT_WEIGHTS
+    blended = [0.0] * len(mcap)
+    for key, values in (('volume', score_values(mcap, 'volume')), ('market_cap', score_values(mcap, 'market_cap')),
+                        ('volume_mcap', ratios)):
+        weight = weights.get(key, 0)
+        if weight:
+            blended = [b + weight * s for b, s in zip(blended, percentile_scores(values))]
+    return blended
+
+class Ranking:
+    """
+    Ranks market data once and orders any number of pairs lists by that ranking.
+
+    Coins and lines are matched on their canonical coin (see aliases.AliasTable):
+    every ranked coin contributes the first line of its coin, followed by the
+    unmatched lines in file order. A coin whose symbol belongs to another coin
+    with a better market cap rank is skipped, and so is any later coin resolving
+    to an already ranked one.
+
+    Args:
+        mcap (list): The market data items returned by load_market_data.
+        sort_key (str): The key to rank by (see score_values).
+        weights (dict, optional): The blend weights for sort_key='blend'.
+        table (AliasTable, optional): The alias table. Defaults to the installed one.
+    """
+
+    def __init__(self, mcap, sort_key='volume', weights=None, table=None):
+        self.sort_key = sort_key
+        self.weights = weights
+        self.table = table or aliases.active
+        order = stable_order(score_values(mcap, sort_key, weights))
+        coins = []
+        for i in order:
+            coin = self.table.canonical(mcap[i]["symbol"].upper())
+            # an empty symbol has no coin to match
+            if coin and coin not in EXCLUDED_CURRENCIES and self.table.owns(coin, mcap[i].get("id")):
+                coins.append(coin)
+        self.symbols = list(dict.fromkeys(coins))
+        # the sorted output only depends on the ranked coins and how lines resolve to them
+        self.fingerprint = manifest.content_hash(self.table.fingerprint + '\n' + '\n'.join(self.symbols))
+        self.candidates = None
+
+    def matched_positions(self, lines, base_currency):
+        """
+        Returns the position of the line matched by each ranked coin, in rank order.
+        """
+        if np is None:
+            index = build_symbol_index(lines, base_currency, self.table)
+            return [index[coin][0] for coin in self.symbols if coin in index]
+
+        # one canonical coin lookup per line, then a vectorized join with the ranked coins
+        line_coins = self.table.line_coins(lines, base_currency)
+        # lines not quoted in base_currency are left out so no key can stand for them
+        quoted = np.array([position for position, coin in enumerate(line_coins) if coin], dtype=np.intp)
+        keys = np.array([line_coins[position] for position in quoted], dtype=str)
+        unique_keys, first = np.unique(keys, return_index=True)
+        if self.candidates is None:
+            self.candidates = np.array(self.symbols, dtype=str)
+        if not len(unique_keys) or not len(self.candidates):
+            return []
+        first = quoted[first]
+        found = np.minimum(np.searchsorted(unique_keys, self.candidates), len(unique_keys) - 1)
+        positions = np.where(unique_keys[found] == self.candidates, first[found], len(lines))
+        return positions[positions < len(lines)].tolist()
+
+    def order_lines(self, lines, base_currency='USDT'):
+        """
+        Orders a pairs list by the ranking.
+
+        Args:
+            lines (list): The TradingView lines of the pairs file.
+            base_currency (str): The base currency of the list (e.g., 'USDT').
+
+        Returns:
+            tuple: The ordered lines and the number of lines matched to a coin.
+        """
+        positions = self.matched_positions(lines, base_currency)
+        sorted_lines = [lines[p] for p in positions]
+        sorted_symbols = set(sorted_lines)
+        matched = len(sorted_lines)
+        sorted_lines += [line for line in lines if line not in sorted_symbols]
+        return sorted_lines, matched
+
+def ticker_score(ticker, open_interest=None):
+    """
+    Returns the quote volume of a ticker, or the quote value of its open interest when given.
+
+    Args:
+        ticker (dict): A compact ticker from cache.load_tickers.
+        open_interest (dict, optional): The contract's entry from cache.load_open_interest.
+
+    Returns:
+        float: The score, or None if the exchange reported nothing to rank by.
+    """
+    last = ticker.get('last')
+    if open_interest is not None:
+        if open_interest.get('value'):
+            return open_interest['value']
+        return open_interest['amount'] * last if open_interest.get('amount') and last else None
+    if ticker.get('quoteVolume') is not None:
+        return ticker['quoteVolume']
+    return ticker['baseVolume'] * last if ticker.get('baseVolume') is not None and last else None
+
+def ticker_line(exchange, symbol):
+    """
+    Returns the TradingView id of a ccxt ticker symbol.
+
+    Args:
+        exchange (str): The exchange whose TradingView prefix the lines use.
+        symbol (str): The ccxt symbol (e.g., 'BTC/USDT:USDT').
+
+    Returns:
+        str: The TradingView id, or None for dated futures (they have no TradingView PERP line).
+    """
+    pair, _, settle = symbol.partition(':')
+    if '-' in settle:
+        return None
+    return tradingview_id(exchange, pair.replace('/', ''), 'swap' if settle else 'spot')
+
+class TickerRanking:
+    """
+    Orders pairs lists by exchange tickers: quote volume, or open interest for contracts.
+
+    Lines are matched to tickers by their TradingView id. Lines without a ticker
+    keep their file order after the ranked ones, like the unsorted tail of
+    sort_market_data.
+
+    Args:
+        tickers (dict): The compact tickers returned by cache.load_tickers.
+        exchange (str): The exchange whose TradingView prefix the lines use.
+        open_interest (dict, optional): The open interest returned by cache.load_open_interest.
+                                        When given, contracts are ranked by its quote value.
+    """
+
+    def __init__(self, tickers, exchange='binance', open_interest=None):
+        self.scores = {}
+        for symbol, ticker in tickers.items():
+            line = ticker_line(exchange, symbol)
+            if line is None:
+                continue
+            score = ticker_score(ticker, open_interest.get(symbol, {}) if open_interest else None)
+            if score is not None:
+                self.scores[line] = score
+        self.fingerprint = manifest.content_hash(json.dumps(sorted(self.scores.items())))
+
+    def order_lines(self, lines, base_currency='USDT'):
+        """
+        Orders a pairs list by descending score, ties keeping their file order.
+
+        Args:
+            lines (list): The TradingView lines of the pairs file.
+            base_currency (str): Unused; the lines are matched by their full id.
+
+        Returns:
+            tuple: The ordered lines and the number of lines with a ticker.
+        """
+        scored = [line for line in dict.fromkeys(lines) if line in self.scores]
+        sorted_lines = sorted(scored, key=lambda line: -self.scores[line])
+        ranked = set(sorted_lines)
+        matched = len(sorted_lines)
+        sorted_lines += [line for line in lines if line not in ranked]
+        return sorted_lines, matched
+
+def load_ticker_ranking(exchange_id, market_type, sort_key='exchange_volume'):
+    """
+    Builds a TickerRanking from one bulk ticker request (plus one open interest request), cached per exchange.
+
+    Args:
+        exchange_id (str): The ccxt exchange ID (e.g., 'binance').
+        market_type (str): The market type ('swap' or 'spot').
+        sort_key (str): 'exchange_volume' or 'open_interest'.
+
+    Returns:
+        TickerRanking: The ranking.
+    """
+    tickers = cache.load_tickers(exchange_id, market_type)
+    open_interest = None
+    if sort_key == 'open_interest' and market_type == 'swap':
+        open_interest = cache.load_open_interest(exchange_id, market_type)
+        if not open_interest:
+            print(f"{exchange_id} has no bulk open interest, ranking {market_type} pairs by quote volume")
+    return TickerRanking(tickers, exchange_id, open_interest)
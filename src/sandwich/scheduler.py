@@ -0,0 +1,99 @@
+"""
+Process pool scheduler for the sort and write stage.
+
+Every sorted list is independent of the others, so with more than one worker
+the sort_market_data jobs run in a process pool. The rankings are handed to
+the workers once: inherited through fork where it is available, otherwise
+passed to the initializer of each worker. Workers never parse marketcap.json.
+
+Workers do not save the shared manifest or print directly. Their manifest
+entries, metrics and progress output are returned to the parent, which records
+them in job order, so the manifest has a single writer.
+"""
+
+import contextlib
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from sandwich import manifest, metrics, outputs
+from sandwich.process import sort_market_data
+
+# The rankings shared with the pool workers, by market type
+rankings = {}
+
+def init_worker(shared_rankings=None, output_settings=None):
+    """
+    Prepares a worker process.
+
+    Args:
+        shared_rankings (dict, optional): The rankings by market type. None when they were inherited through fork.
+        output_settings (dict, optional): The parent's outputs.settings. None when they were inherited through fork.
+    """
+    if shared_rankings is not None:
+        rankings.update(shared_rankings)
+    if output_settings is not None:
+        outputs.settings.update(output_settings)
+
+def sort_job(job):
+    """
+    Runs one sort in a worker process.
+
+    Args:
+        job (tuple): The (base_currency, market_type, is_hyperliquid) of the list.
+
+    Returns:
+        tuple: The sorted lines, the deferred manifest entries, the metrics recorded
+               by the job and its progress output.
+    """
+    base_currency, market_type, is_hyperliquid = job
+    # a forked worker starts with a copy of the parent's metrics
+    metrics.reset()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), manifest.deferred_entries() as entries:
+        lines = sort_market_data(base_currency, market_type, is_hyperliquid, ranking=rankings[market_type])
+    return lines, entries, metrics.snapshot(), output.getvalue()
+
+def pool_context(job_rankings):
+    """
+    Returns the multiprocessing context and the initializer arguments that share the rankings.
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # forked workers inherit the rankings without pickling them
+        rankings.clear()
+        rankings.update(job_rankings)
+        return multiprocessing.get_context('fork'), (None, None)
+    return multiprocessing.get_context('spawn'), (job_rankings, dict(outputs.settings))
+
+def run_sorts(jobs, job_rankings, workers=1):
+    """
+    Runs sort_market_data for every job, in a process pool when there are several workers and jobs.
+
+    Args:
+        jobs (list): (base_currency, market_type, is_hyperliquid) tuples.
+        job_rankings (dict): The Ranking or TickerRanking of each market type.
+        workers (int): The number of worker processes. 1 sorts in this process.
+
+    Returns:
+        list: The sorted lines of each job, in job order.
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        return [sort_market_data(base_currency, market_type, is_hyperliquid, ranking=job_rankings[market_type])
+                for base_currency, market_type, is_hyperliquid in jobs]
+
+    workers = min(workers, len(jobs))
+    results = []
+    context, initargs = pool_context(job_rankings)
+    try:
+        with metrics.span('sort_pool', workers=workers) as record, \
+                ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker, initargs=initargs) as pool:
+            for lines, entries, (job_spans, job_counters), output in pool.map(sort_job, jobs):
+                print(output, end='')
+                for manifest_file, job_entries in entries.items():
+                    manifest.save_entries(job_entries, manifest_file)
+                metrics.merge(job_spans, job_counters)
+                results.append(lines)
+            record['items'] = len(jobs)
+    finally:
+        rankings.clear()
+    return results
@@ -0,0 +1,233 @@
+"""
+Long-running daemon that keeps exchange clients and market data warm.
+
+Markets and CoinGecko data are refreshed on their own intervals (with jitter),
+the sorted lists are regenerated after every refresh, and the current lists
+are served from memory over a local HTTP endpoint.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import ccxt
+
+from sandwich import aliases, cache
+from sandwich.binance.pairs import get_and_save_pairs
+from sandwich.coingecko.markets import refresh_market_data, save_market_data
+from sandwich.hyperliquid.pairs import get_and_save_hyperliquid_pairs
+from sandwich.process import list_file_names, load_market_data, sort_market_data
+from sandwich.ranking import Ranking
+
+def jittered(interval, jitter):
+    """
+    Returns an interval randomly spread by +/- jitter (a fraction of the interval).
+
+    Args:
+        interval (float): The base interval in seconds.
+        jitter (float): The maximum relative deviation (e.g., 0.1 for 10%).
+
+    Returns:
+        float: The jittered interval in seconds.
+    """
+    return interval * (1 + random.uniform(-jitter, jitter))
+
+class ListService:
+    """
+    Holds warm exchange instances, parsed market data and the current sorted lists.
+
+    Args:
+        targets (list): (base_currency, market_type) tuples to maintain.
+        hyperliquid (bool): Whether to also maintain the Hyperliquid-matched lists.
+        fetch (bool): Whether to refresh CoinGecko market data.
+        get_pairs (bool): Whether to refresh the exchange pairs.
+        pages (int): The number of CoinGecko pages to fetch.
+        limit (int, optional): The number of top market cap coins to consider.
+        top_k (int, optional): The number of highest volume coins to keep.
+        delta (bool): Whether to refresh only the volumes of known coins between full fetches.
+    """
+
+    def __init__(self, targets, hyperliquid=False, fetch=True, get_pairs=True, pages=2, limit=500, top_k=None, delta=False):
+        self.targets = targets
+        self.hyperliquid = hyperliquid
+        self.fetch = fetch
+        self.get_pairs = get_pairs
+        self.pages = pages
+        self.limit = limit
+        self.top_k = top_k
+        self.delta = delta
+
+        self.exchanges = {'binance': ccxt.binance()}
+        if hyperliquid:
+            self.exchanges['hyperliquid'] = ccxt.hyperliquid()
+
+        self.mcap = None
+        self.lists = {}
+        self.refreshed_at = {}
+        self.lock = threading.Lock()
+
+    def refresh_markets(self, refresh=True):
+        """
+        Reloads exchange markets with the warm instances and saves the pairs files.
+        """
+        if self.get_pairs:
+            markets = cache.load_markets('binance', refresh=refresh, exchange=self.exchanges['binance'])
+            for base_currency, market_type in self.targets:
+                get_and_save_pairs(base_currency, market_type, markets)
+        if self.hyperliquid:
+            markets = cache.load_markets('hyperliquid', refresh=refresh, exchange=self.exchanges['hyperliquid'])
+            for base_currency, market_type in self.targets:
+                get_and_save_hyperliquid_pairs(base_currency, 'USDT', market_type, markets)
+        self.refreshed_at['markets'] = time.time()
+
+    def refresh_marketcap(self, fetch=True):
+        """
+        Downloads (optionally) and parses CoinGecko market data.
+        """
+        if fetch and self.fetch and self.delta:
+            refresh_market_data(pages=self.pages)
+        elif fetch and self.fetch:
+            save_market_data(pages=self.pages)
+        self.mcap = load_market_data(limit=self.limit, top_k=self.top_k)
+        aliases.install(aliases.load_alias_table())
+        self.refreshed_at['marketcap'] = time.time()
+
+    def regenerate(self):
+        """
+        Regenerates every sorted list from the in-memory market data.
+        """
+        lists = {}
+        ranking = Ranking(self.mcap)
+        for base_currency, market_type in self.targets:
+            if self.hyperliquid:
+                _, sorted_file = list_file_names('USDT', market_type, is_hyperliquid=True)
+                lists[sorted_file] = sort_market_data('USDT', market_type, is_hyperliquid=True, ranking=ranking)
+            _, sorted_file = list_file_names(base_currency, market_type)
+            lists[sorted_file] = sort_market_data(base_currency, market_type, ranking=ranking)
+        with self.lock:
+            self.lists = lists
+            self.refreshed_at['lists'] = time.time()
+
+    def get_list(self, name):
+        """
+        Returns the current lines of a sorted list.
+
+        Args:
+            name (str): The sorted file name, with or without the '.txt' extension.
+
+        Returns:
+            list: The sorted lines, or None if the list is unknown.
+        """
+        if not name.endswith('.txt'):
+            name += '.txt'
+        with self.lock:
+            return self.lists.get(name)
+
+    def status(self):
+        """
+        Returns the available lists and the last refresh times.
+        """
+        with self.lock:
+            return {'lists': sorted(self.lists), 'refreshed_at': dict(self.refreshed_at)}
+
+    def run_schedule(self, markets_interval, marketcap_interval, jitter, stop):
+        """
+        Runs the refresh jobs until the stop event is set.
+
+        Args:
+            markets_interval (float): Seconds between exchange market refreshes.
+            marketcap_interval (float): Seconds between CoinGecko refreshes.
+            jitter (float): The relative jitter applied to both intervals.
+            stop (threading.Event): Set to stop the scheduler.
+        """
+        now = time.monotonic()
+        next_markets = now + jittered(markets_interval, jitter)
+        next_marketcap = now + jittered(marketcap_interval, jitter)
+
+        while not stop.wait(max(0.0, min(next_markets, next_marketcap) - time.monotonic())):
+            now = time.monotonic()
+            try:
+                if now >= next_markets:
+                    self.refresh_markets()
+                    next_markets = now + jittered(markets_interval, jitter)
+                if now >= next_marketcap:
+                    self.refresh_marketcap()
+                    next_marketcap = now + jittered(marketcap_interval, jitter)
+                self.regenerate()
+            except Exception as e:
+                # keep serving the previous lists until the next refresh succeeds
+                print(f"Refresh failed: {e}")
+                next_markets = max(next_markets, now + jittered(markets_interval, jitter) / 10)
+                next_marketcap = max(next_marketcap, now + jittered(marketcap_interval, jitter) / 10)
+
+def make_handler(service):
+    """
+    Creates an HTTP request handler serving the lists of a ListService.
+
+    GET / returns the service status as JSON and GET /<sorted file name>
+    returns that list as plain text.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            name = self.path.strip('/')
+            if not name:
+                self.send_body(200, json.dumps(service.status()), 'application/json')
+                return
+            lines = service.get_list(name)
+            if lines is None:
+                self.send_body(404, f'Unknown list: {name}\n', 'text/plain')
+                return
+            self.send_body(200, ''.join(line + '\n' for line in lines), 'text/plain')
+
+        def send_body(self, status, body, content_type):
+            data = body.encode()
+            self.send_response(status)
+            self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def serve(service, host='127.0.0.1', port=8765, markets_interval=3600, marketcap_interval=900, jitter=0.1):
+    """
+    Warms up the service, starts the refresh scheduler and serves the lists until interrupted.
+
+    Args:
+        service (ListService): The service to run.
+        host (str): The address to listen on.
+        port (int): The port to listen on.
+        markets_interval (float): Seconds between exchange market refreshes.
+        marketcap_interval (float): Seconds between CoinGecko refreshes.
+        jitter (float): The relative jitter applied to both intervals.
+
+    Returns:
+        None
+    """
+    # Start from cached markets and the existing marketcap.json when available
+    service.refresh_markets(refresh=False)
+    try:
+        service.refresh_marketcap(fetch=False)
+    except FileNotFoundError:
+        service.refresh_marketcap()
+    service.regenerate()
+
+    stop = threading.Event()
+    scheduler = threading.Thread(target=service.run_schedule,
+                                 args=(markets_interval, marketcap_interval, jitter, stop), daemon=True)
+    scheduler.start()
+
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Serving sorted lists on http://{host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
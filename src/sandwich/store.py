@@ -0,0 +1,380 @@
+"""
+Optional SQLite storage backend for market snapshots and pair lists.
+
+CoinGecko snapshots are kept with their timestamp so volume history can be
+queried, pair lists are stored per file name, and sorting runs as an indexed
+query. TradingView text files are exported from the database on demand.
+"""
+
+import sqlite3
+import time
+
+from sandwich import aliases, manifest, metrics, outputs, pairfile
+from sandwich.process import EXCLUDED_CURRENCIES, list_file_names
+from sandwich.symbols import Symbol, tradingview_lines
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    taken_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS coins (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    coin_id TEXT,
+    symbol TEXT NOT NULL,
+    market_cap_rank INTEGER,
+    market_cap REAL,
+    total_volume REAL NOT NULL,
+    PRIMARY KEY (snapshot_id, position)
+);
+CREATE INDEX IF NOT EXISTS coins_symbol ON coins (symbol, snapshot_id);
+CREATE TABLE IF NOT EXISTS pair_lists (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    exchange TEXT,
+    base_currency TEXT NOT NULL,
+    market_type TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pairs (
+    list_id INTEGER NOT NULL REFERENCES pair_lists(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    line TEXT NOT NULL,
+    key TEXT NOT NULL,
+    coin TEXT,
+    PRIMARY KEY (list_id, position)
+);
+CREATE INDEX IF NOT EXISTS pairs_key ON pairs (list_id, key, position);
+CREATE INDEX IF NOT EXISTS pairs_coin ON pairs (list_id, coin, position);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+'''
+
+# Bumped when the stored pair keys must be recomputed
+SCHEMA_VERSION = 1
+
+# Mirrors ranking.Ranking: coins are taken in market cap order, ranked by volume
+# (ties keep market cap order), resolved to their canonical coin and matched to
+# the first line of that coin. Coins owned by another CoinGecko id are skipped,
+# and so is any later coin resolving to an already matched line. Lines not quoted
+# in the list's currency are keyed '', so coins with an empty symbol are skipped.
+SORTED_QUERY = '''
+WITH considered AS (
+    SELECT position, canonical(upper(symbol)) AS coin, coin_id, total_volume
+    FROM coins WHERE snapshot_id = :snapshot ORDER BY position LIMIT :limit
+),
+ranked AS (
+    SELECT * FROM considered ORDER BY total_volume DESC, position LIMIT :top_k
+),
+matched AS (
+    SELECT ranked.position AS coin_position, ranked.total_volume,
+           (SELECT min(p.position) FROM pairs p WHERE p.list_id = :list AND p.key = ranked.coin) AS pair_position
+    FROM ranked
+    WHERE ranked.coin != '' AND ranked.coin NOT IN ({excluded}) AND owns(ranked.coin, ranked.coin_id)
+),
+first_matches AS (
+    SELECT *, row_number() OVER (PARTITION BY pair_position ORDER BY total_volume DESC, coin_position) AS n
+    FROM matched WHERE pair_position IS NOT NULL
+)
+SELECT p.line FROM first_matches m
+JOIN pairs p ON p.list_id = :list AND p.position = m.pair_position
+WHERE m.n = 1
+ORDER BY m.total_volume DESC, m.coin_position
+'''
+
+# Mirrors hyperliquid.pairs.match_pairs_between_exchanges: source pairs are
+# matched on their normalized coin, the last target pair for a coin wins.
+MATCH_QUERY = '''
+SELECT (SELECT t.line FROM pairs t WHERE t.list_id = :target AND t.position =
+        (SELECT max(c.position) FROM pairs c WHERE c.list_id = :target AND c.coin = s.coin))
+FROM pairs s WHERE s.list_id = :source AND s.coin IS NOT NULL
+ORDER BY s.position
+'''
+
+def connect(path):
+    """
+    Opens (and initializes if needed) a sandwich SQLite database.
+
+    Args:
+        path (str): The database file path.
+
+    Returns:
+        sqlite3.Connection: The connection.
+    """
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.executescript(SCHEMA)
+    # the queries resolve CoinGecko symbols with the installed alias table, which can be replaced
+    # between queries, so the functions are not declared deterministic
+    conn.create_function('canonical', 1, lambda coin: aliases.active.canonical(coin))
+    conn.create_function('owns', 2, lambda coin, coin_id: aliases.active.owns(coin, coin_id))
+    if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+        rekey_pairs(conn)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    sync_aliases(conn)
+    return conn
+
+def sync_aliases(conn):
+    """
+    Rekeys the stored pairs if they were keyed with another alias table than the installed one.
+
+    Call it after installing a new table (see aliases.install).
+    """
+    fingerprint = aliases.active.fingerprint
+    row = conn.execute("SELECT value FROM meta WHERE name = 'aliases'").fetchone()
+    if row is not None and row[0] == fingerprint:
+        return
+    rekey_pairs(conn)
+
+def rekey_pairs(conn):
+    """
+    Recomputes the canonical coin keys of every stored pair with the installed alias table,
+    e.g. after the alias rules or the alias table changed.
+    """
+    table = aliases.active
+    with metrics.span('store_rekey') as record, conn:
+        count = 0
+        for list_id, base_currency, market_type in conn.execute(
+                'SELECT id, base_currency, market_type FROM pair_lists').fetchall():
+            rows = conn.execute('SELECT line, position FROM pairs WHERE list_id = ?', (list_id,)).fetchall()
+            conn.executemany('UPDATE pairs SET key = ?, coin = ? WHERE list_id = ? AND position = ?',
+                             ((*pair_keys(table, line, base_currency, market_type), list_id, position)
+                              for line, position in rows))
+            count += len(rows)
+        conn.execute("INSERT INTO meta (name, value) VALUES ('aliases', ?) "
+                     "ON CONFLICT (name) DO UPDATE SET value = excluded.value", (table.fingerprint,))
+        record['items'] = count
+
+def pair_keys(table, line, base_currency, market_type):
+    """
+    Returns the sort key and the match coin of a stored line.
+
+    Returns:
+        tuple: The canonical coin of the line ('' if it is not quoted in base_currency),
+               and the coin of its parsed Symbol (None if the line does not parse).
+    """
+    symbol = Symbol.from_tradingview(line, base_currency, market_type)
+    return table.line_coin(line, base_currency) or '', symbol.coin if symbol else None
+
+def save_snapshot(conn, mcap, taken_at=None):
+    """
+    Stores a CoinGecko market data snapshot.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        mcap (list): The market data items, in market cap order.
+        taken_at (float, optional): The snapshot timestamp. Defaults to now.
+
+    Returns:
+        int: The snapshot id.
+    """
+    with metrics.span('store_snapshot') as record, conn:
+        cursor = conn.execute('INSERT INTO snapshots (taken_at) VALUES (?)', (taken_at or time.time(),))
+        snapshot_id = cursor.lastrowid
+        conn.executemany(
+            'INSERT INTO coins (snapshot_id, position, coin_id, symbol, market_cap_rank, market_cap, total_volume) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            ((snapshot_id, position, item.get('id'), item['symbol'], item.get('market_cap_rank'),
+              item.get('market_cap'), item.get('total_volume') or 0)
+             for position, item in enumerate(mcap)))
+        record['items'] = len(mcap)
+    return snapshot_id
+
+def latest_snapshot(conn):
+    """
+    Returns the id of the most recent snapshot, or None if there is none.
+    """
+    row = conn.execute('SELECT id FROM snapshots ORDER BY taken_at DESC, id DESC LIMIT 1').fetchone()
+    return row[0] if row else None
+
+def save_pair_list(conn, name, lines, base_currency, market_type, exchange=None):
+    """
+    Stores (replacing any previous version) a list of TradingView pair lines.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        name (str): The list name, i.e. its pairs file name (e.g., 'usdt_swap_pairs.txt').
+        lines (list): The TradingView lines.
+        base_currency (str): The base currency of the list (e.g., 'USDT').
+        market_type (str): The type of market ('swap' or 'spot').
+        exchange (str, optional): The exchange ID.
+
+    Returns:
+        int: The list id.
+    """
+    with conn:
+        conn.execute(
+            'INSERT INTO pair_lists (name, exchange, base_currency, market_type, updated_at) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (name) DO UPDATE SET exchange = excluded.exchange, base_currency = excluded.base_currency, '
+            'market_type = excluded.market_type, updated_at = excluded.updated_at',
+            (name, exchange, base_currency, market_type, time.time()))
+        list_id = conn.execute('SELECT id FROM pair_lists WHERE name = ?', (name,)).fetchone()[0]
+        conn.execute('DELETE FROM pairs WHERE list_id = ?', (list_id,))
+        table = aliases.active
+        rows = [(list_id, position, line, *pair_keys(table, line, base_currency, market_type))
+                for position, line in enumerate(lines)]
+        conn.executemany('INSERT INTO pairs (list_id, position, line, key, coin) VALUES (?, ?, ?, ?, ?)', rows)
+    return list_id
+
+def find_list(conn, name):
+    """
+    Returns the id of a stored pair list, or None if it is not stored.
+    """
+    row = conn.execute('SELECT id FROM pair_lists WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else None
+
+def import_pairs_file(conn, filename, base_currency, market_type):
+    """
+    Stores a pairs file written by the exchange modules under its file name.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        filename (str): The pairs file (e.g., 'usdt_swap_pairs.txt').
+        base_currency (str): The base currency of the list (e.g., 'USDT').
+        market_type (str): The type of market ('swap' or 'spot').
+
+    Returns:
+        int: The list id, or None if the file does not exist.
+    """
+    try:
+        lines = pairfile.read_lines(filename)
+    except FileNotFoundError:
+        return None
+    exchange = lines[0].partition(':')[0].lower() if lines else None
+    return save_pair_list(conn, filename, lines, base_currency, market_type, exchange)
+
+def match_lists(conn, source_name, target_name):
+    """
+    Matches the pairs of one stored list against another on their normalized coin names.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        source_name (str): The list whose coins are looked up.
+        target_name (str): The list providing the matched lines.
+
+    Returns:
+        list: The matched target lines in source order, or None if a list is not stored.
+    """
+    source, target = find_list(conn, source_name), find_list(conn, target_name)
+    if source is None or target is None:
+        return None
+    with metrics.span('match', source=source_name, target=target_name, backend='sqlite') as record:
+        lines = [line for (line,) in conn.execute(MATCH_QUERY, {'source': source, 'target': target}) if line]
+        record['items'] = len(lines)
+    return lines
+
+def match_hyperliquid_pairs(conn, hyperliquid_pairs, hyperliquid_base_currency='USDC', binance_base_currency='USDT',
+                            market_type='swap'):
+    """
+    Matches Hyperliquid pairs with the stored Binance pairs list and writes the Hyperliquid-matched
+    pairs file, like hyperliquid.pairs.get_and_save_hyperliquid_pairs but with an indexed query.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        hyperliquid_pairs (list or SymbolTable): The Hyperliquid pairs.
+        hyperliquid_base_currency (str): The quote currency of the Hyperliquid pairs (e.g., 'USDC').
+        binance_base_currency (str): The quote currency of the Binance pairs (e.g., 'USDT').
+        market_type (str): The type of market ('swap' or 'spot').
+
+    Returns:
+        list: The matched Binance lines, or None if the Binance pairs file does not exist.
+    """
+    binance_file, _ = list_file_names(binance_base_currency, market_type)
+    hype_file, _ = list_file_names(binance_base_currency, market_type, is_hyperliquid=True)
+    if import_pairs_file(conn, binance_file, binance_base_currency, market_type) is None:
+        return None
+    source_name = f'hyperliquid_{hyperliquid_base_currency.lower()}_{market_type}_pairs'
+    save_pair_list(conn, source_name, tradingview_lines(hyperliquid_pairs, 'hyperliquid', market_type),
+                   hyperliquid_base_currency, market_type, 'hyperliquid')
+    lines = match_lists(conn, source_name, binance_file)
+    print(f"Matched pairs: {len(lines)} found")
+    if outputs.write_list(hype_file, lines, {'type': market_type}):
+        print(f"Hyperliquid-matched {binance_base_currency} {market_type} pairs saved to {hype_file} in TradingView format.")
+    return lines
+
+def rank_lines(conn, base_currency, market_type, is_hyperliquid=False, snapshot_id=None, limit=500, top_k=None):
+    """
+    Sorts a stored pair list like sorted_lines, also returning the number of ranked lines.
+
+    Returns:
+        tuple: The sorted lines and the number of ranked lines at their start,
+               or None if the list or a snapshot is missing.
+    """
+    txt_file, _ = list_file_names(base_currency, market_type, is_hyperliquid)
+    pairs_list = find_list(conn, txt_file)
+    snapshot_id = snapshot_id or latest_snapshot(conn)
+    if pairs_list is None or snapshot_id is None:
+        return None
+
+    params = {'snapshot': snapshot_id, 'list': pairs_list, 'base': base_currency,
+              'limit': -1 if limit is None else limit, 'top_k': -1 if top_k is None else top_k}
+    excluded = ', '.join(f"'{currency}'" for currency in EXCLUDED_CURRENCIES)
+    lines = [line for (line,) in conn.execute(SORTED_QUERY.format(excluded=excluded), params)]
+    ranked = len(lines)
+
+    # Append unsorted pairs
+    matched = set(lines)
+    lines += [line for (line,) in conn.execute('SELECT line FROM pairs WHERE list_id = ? ORDER BY position', (pairs_list,))
+              if line not in matched]
+    return lines, ranked
+
+def sorted_lines(conn, base_currency, market_type, is_hyperliquid=False, snapshot_id=None, limit=500, top_k=None):
+    """
+    Sorts a stored pair list by the volume ranking of a snapshot with an indexed query.
+    Produces the same order as ranking.Ranking with the installed alias table.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        base_currency (str): The base currency (e.g., 'USDT').
+        market_type (str): The type of market ('swap' or 'spot').
+        is_hyperliquid (bool): Whether to sort the Hyperliquid-matched list.
+        snapshot_id (int, optional): The snapshot to rank by. Defaults to the latest.
+        limit (int, optional): The number of top market cap coins to consider. None considers all.
+        top_k (int, optional): The number of highest volume coins to keep. None keeps all.
+
+    Returns:
+        list: The sorted lines, or None if the list or a snapshot is missing.
+    """
+    result = rank_lines(conn, base_currency, market_type, is_hyperliquid, snapshot_id, limit, top_k)
+    return None if result is None else result[0]
+
+def export_sorted(conn, base_currency, market_type, is_hyperliquid=False, snapshot_id=None, limit=500, top_k=None):
+    """
+    Exports a sorted list from the database to its sorted_*.txt file.
+
+    Returns:
+        list: The sorted lines, or None if the list or a snapshot is missing.
+    """
+    _, sorted_file = list_file_names(base_currency, market_type, is_hyperliquid)
+    snapshot_id = snapshot_id or latest_snapshot(conn)
+    with metrics.span('sort', list=sorted_file, backend='sqlite') as record:
+        result = rank_lines(conn, base_currency, market_type, is_hyperliquid, snapshot_id, limit, top_k)
+        if result is None:
+            print(f"No stored pairs or snapshot for {sorted_file}")
+            return None
+        lines, matched = result
+        record['items'] = len(lines)
+        outputs.write_list(sorted_file, lines,
+                           {'db_snapshot': snapshot_id, 'limit': limit, 'top_k': top_k,
+                            'aliases': aliases.active.fingerprint}, matched)
+    return lines
+
+def volume_history(conn, symbol, since=None):
+    """
+    Returns the stored total volume history of a coin.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        symbol (str): The CoinGecko symbol (e.g., 'btc').
+        since (float, optional): Only return snapshots taken after this timestamp.
+
+    Returns:
+        list: (taken_at, coin_id, total_volume) tuples in chronological order.
+    """
+    return conn.execute(
+        'SELECT s.taken_at, c.coin_id, c.total_volume FROM coins c JOIN snapshots s ON s.id = c.snapshot_id '
+        'WHERE c.symbol = ? AND s.taken_at >= ? ORDER BY s.taken_at', (symbol.lower(), since or 0)).fetchall()
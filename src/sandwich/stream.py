@@ -0,0 +1,400 @@
+"""
+Streaming watchlist ranking from exchange ticker streams.
+
+Binance pushes the rolling 24h statistics of its markets on the ticker stream
+(ccxt.pro watch_tickers). Each sorted list keeps the latest 24h volume of its
+pairs in a sorted list of keys split into small blocks, with a Fenwick tree
+over the block sizes: an update removes and re-adds one key in O(log n + block
+size) instead of re-sorting or shifting the whole list, and the old and new
+rank tell whether the top of the list changed. A sorted_*.txt file is only
+re-emitted when the order of its top lines changed.
+
+Ticker batches can be recorded as JSON lines and replayed later in place of
+the exchange, e.g. to check a ranking offline.
+"""
+
+import asyncio
+import contextlib
+import json
+import time
+from bisect import bisect_left
+from itertools import chain, islice
+
+from sandwich import cache, manifest, metrics, outputs, pairfile
+from sandwich.process import list_file_names
+from sandwich.ranking import ticker_line, ticker_score
+
+DEFAULT_TOP = 50
+
+# Keys per block of a SortedKeys; a block is split in two past twice this size
+BLOCK_LOAD = 64
+
+class SortedKeys:
+    """
+    Sorted list of distinct keys split into blocks of at most 2 * load keys.
+
+    A key is located by bisecting the block maxima and then its block, and a
+    Fenwick tree over the block sizes gives the number of keys before a block,
+    so adding, removing or ranking a key costs O(log n + load). The tree is
+    rebuilt only when a block is split or emptied.
+
+    Args:
+        keys (iterable): The initial keys.
+        load (int): The target number of keys per block.
+    """
+
+    def __init__(self, keys=(), load=BLOCK_LOAD):
+        keys = sorted(keys)
+        self.load = load
+        self.blocks = [keys[i:i + load] for i in range(0, len(keys), load)]
+        self.reindex()
+
+    def reindex(self):
+        """
+        Rebuilds the block maxima and the Fenwick tree after the blocks changed.
+        """
+        self.maxes = [block[-1] for block in self.blocks]
+        self.tree = [0] * (len(self.blocks) + 1)
+        for i, block in enumerate(self.blocks, 1):
+            self.tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[i]
+
+    def resize(self, index, delta):
+        """
+        Adds delta to the size of a block in the Fenwick tree.
+        """
+        i = index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def offset(self, index):
+        """
+        Returns the number of keys in the blocks before a block.
+        """
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def __len__(self):
+        return self.offset(len(self.blocks))
+
+    def __iter__(self):
+        return chain.from_iterable(self.blocks)
+
+    def rank(self, key):
+        """
+        Returns the number of keys lower than a key (bisect_left over the whole list).
+        """
+        index = bisect_left(self.maxes, key)
+        if index == len(self.blocks):
+            return self.offset(index)
+        return self.offset(index) + bisect_left(self.blocks[index], key)
+
+    def add(self, key):
+        """
+        Inserts a key that is not in the list.
+
+        Returns:
+            int: The rank of the inserted key.
+        """
+        if not self.blocks:
+            self.blocks.append([key])
+            self.reindex()
+            return 0
+        # past the last maximum the key goes at the end of the last block
+        index = min(bisect_left(self.maxes, key), len(self.blocks) - 1)
+        block = self.blocks[index]
+        position = bisect_left(block, key)
+        block.insert(position, key)
+        rank = self.offset(index) + position
+        if len(block) > 2 * self.load:
+            self.blocks[index:index + 1] = [block[:self.load], block[self.load:]]
+            self.reindex()
+        else:
+            self.maxes[index] = block[-1]
+            self.resize(index, 1)
+        return rank
+
+    def remove(self, key):
+        """
+        Removes a key that is in the list.
+
+        Returns:
+            int: The rank the key had.
+        """
+        index = bisect_left(self.maxes, key)
+        block = self.blocks[index]
+        position = bisect_left(block, key)
+        del block[position]
+        rank = self.offset(index) + position
+        if block:
+            self.maxes[index] = block[-1]
+            self.resize(index, -1)
+        else:
+            del self.blocks[index]
+            self.reindex()
+        return rank
+
+class StreamRanking:
+    """
+    Pairs list kept in descending 24h volume order as volumes are updated.
+
+    Lines without a volume follow the ranked ones in file order, like the
+    unranked tail of ranking.TickerRanking, and ties keep their file order.
+
+    Args:
+        lines (list): The TradingView lines of the list.
+        top (int): The number of leading lines whose order is tracked.
+    """
+
+    def __init__(self, lines, top=DEFAULT_TOP):
+        self.lines = list(dict.fromkeys(lines))
+        self.positions = {line: position for position, line in enumerate(self.lines)}
+        # ascending (unranked, -volume, file position) keys are the list order
+        self.keys = {line: (1, 0.0, position) for line, position in self.positions.items()}
+        self.order = SortedKeys(self.keys.values())
+        self.top = top
+
+    def update(self, line, score):
+        """
+        Sets the volume of a line and moves it to its new rank.
+
+        Args:
+            line (str): The TradingView line. Lines not in the list are ignored.
+            score (float): The 24h volume, None if the exchange reported none.
+
+        Returns:
+            bool: True if the order of the top lines changed.
+        """
+        position = self.positions.get(line)
+        if position is None:
+            return False
+        # NaN never compares equal to itself
+        key = (1, 0.0, position) if score is None or score != score else (0, -score, position)
+        old_key = self.keys[line]
+        if key == old_key:
+            return False
+        old_rank = self.order.remove(old_key)
+        new_rank = self.order.add(key)
+        self.keys[line] = key
+        return old_rank != new_rank and min(old_rank, new_rank) < self.top
+
+    def rank(self, line):
+        """
+        Returns the 0-based rank of a line.
+        """
+        return self.order.rank(self.keys[line])
+
+    def ranked_count(self):
+        """
+        Returns the number of lines with a volume, which lead the list.
+        """
+        # lines without a volume sort last, after every (0, ...) key
+        return self.order.rank((1,))
+
+    def ordered_lines(self):
+        """
+        Returns every line in rank order.
+        """
+        return [self.lines[key[2]] for key in self.order]
+
+    def top_lines(self):
+        """
+        Returns the top lines in rank order.
+        """
+        return [self.lines[key[2]] for key in islice(self.order, self.top)]
+
+class StreamedList:
+    """
+    A sorted list maintained from a ticker stream.
+
+    Args:
+        base_currency (str): The base currency (e.g., 'USDT').
+        market_type (str): The type of market ('swap' or 'spot').
+        is_hyperliquid (bool): Whether it is the Hyperliquid-matched list.
+        top (int): The number of leading lines whose order change re-emits the file.
+        exchange (str): The exchange streaming the tickers.
+
+    Raises:
+        FileNotFoundError: If the pairs file does not exist.
+    """
+
+    def __init__(self, base_currency, market_type, is_hyperliquid=False, top=DEFAULT_TOP, exchange='binance'):
+        txt_file, self.sorted_file = list_file_names(base_currency, market_type, is_hyperliquid)
+        with pairfile.mapped(txt_file) as buf:
+            self.inputs = {'pairs': manifest.content_hash(buf), 'stream': exchange}
+            lines = buf[:].decode().splitlines()
+        self.market_type = market_type
+        self.ranking = StreamRanking(lines, top)
+        self.changed = True
+        self.emitted = None
+
+    def apply(self, scores):
+        """
+        Applies the volumes of a ticker batch.
+
+        Args:
+            scores (dict): TradingView line to 24h volume.
+        """
+        for line, score in scores.items():
+            if self.ranking.update(line, score):
+                self.changed = True
+
+    def emit(self):
+        """
+        Writes the sorted file if the order of its top lines changed since the last write.
+
+        Returns:
+            bool: True if the file was written.
+        """
+        if not self.changed:
+            return False
+        self.changed = False
+        top_lines = self.ranking.top_lines()
+        # moves within one batch can cancel out
+        if top_lines == self.emitted:
+            return False
+        self.emitted = top_lines
+        metrics.incr('stream_emits_total')
+        outputs.write_list(self.sorted_file, self.ranking.ordered_lines(), self.inputs, self.ranking.ranked_count())
+        return True
+
+def ticker_scores(tickers, exchange='binance'):
+    """
+    Returns the 24h volume of each TradingView line in a ticker batch.
+
+    Args:
+        tickers (dict): Compact tickers (cache.TICKER_FIELDS) keyed by ccxt symbol.
+        exchange (str): The exchange whose TradingView prefix the lines use.
+
+    Returns:
+        dict: TradingView line to 24h volume (None when the ticker has none).
+    """
+    scores = {}
+    for symbol, ticker in tickers.items():
+        line = ticker_line(exchange, symbol)
+        if line is not None:
+            scores[line] = ticker_score(ticker)
+    return scores
+
+async def exchange_feed(exchange_id, market_type):
+    """
+    Yields ticker batches from the exchange's WebSocket ticker stream.
+
+    Args:
+        exchange_id (str): The ccxt exchange ID (e.g., 'binance').
+        market_type (str): The market type ('swap' or 'spot').
+
+    Yields:
+        dict: Compact tickers (cache.TICKER_FIELDS) keyed by ccxt symbol.
+    """
+    import ccxt.pro
+    exchange = getattr(ccxt.pro, exchange_id)()
+    try:
+        while True:
+            tickers = await exchange.watch_tickers(params={'type': market_type})
+            yield {symbol: {field: ticker.get(field) for field in cache.TICKER_FIELDS}
+                   for symbol, ticker in tickers.items()}
+    finally:
+        await exchange.close()
+
+async def replay_feed(path, market_type, speed=None):
+    """
+    Yields the ticker batches of one market type recorded by stream(record=...).
+
+    Args:
+        path (str): The recorded JSON lines file.
+        market_type (str): The market type ('swap' or 'spot').
+        speed (float, optional): Replay speed relative to the recording (1.0 is real time).
+                                 None replays as fast as possible.
+
+    Yields:
+        dict: Compact tickers keyed by ccxt symbol.
+    """
+    previous = None
+    with open(path, 'r') as f:
+        for line in f:
+            event = json.loads(line)
+            if event['market_type'] != market_type:
+                continue
+            if speed and previous is not None:
+                await asyncio.sleep(max(0.0, event['time'] - previous) / speed)
+            previous = event['time']
+            yield event['tickers']
+
+async def consume(feed, lists, market_type, exchange='binance', record=None):
+    """
+    Applies every batch of a feed to the lists of its market type and re-emits the changed lists.
+
+    Args:
+        feed (async iterator): The ticker batches.
+        lists (list): The StreamedList objects of the market type.
+        market_type (str): The market type of the feed.
+        exchange (str): The exchange whose TradingView prefix the lines use.
+        record (file, optional): A text file every batch is appended to as a JSON line.
+    """
+    async with contextlib.aclosing(feed) as batches:
+        async for tickers in batches:
+            if record is not None:
+                record.write(json.dumps({'time': time.time(), 'market_type': market_type, 'tickers': tickers}) + '\n')
+                record.flush()
+            metrics.incr('stream_batches_total')
+            metrics.incr('stream_tickers_total', len(tickers))
+            scores = ticker_scores(tickers, exchange)
+            for streamed in lists:
+                streamed.apply(scores)
+                streamed.emit()
+
+def stream(targets, hyperliquid=False, top=DEFAULT_TOP, replay=None, record=None, speed=None, seed=True,
+           exchange_id='binance'):
+    """
+    Keeps the sorted lists ordered by live 24h volumes until the feed ends or the process is interrupted.
+
+    Args:
+        targets (list): (base_currency, market_type) tuples whose pairs files are streamed.
+        hyperliquid (bool): Whether to also stream the Hyperliquid-matched lists.
+        top (int): The number of leading lines whose order change re-emits a list.
+        replay (str, optional): A file recorded with record to replay instead of the exchange stream.
+        record (str, optional): A file every received ticker batch is appended to.
+        speed (float, optional): The replay speed (see replay_feed).
+        seed (bool): Whether to start from the bulk REST tickers before the first stream update.
+        exchange_id (str): The exchange streaming the tickers.
+    """
+    specs = []
+    for base_currency, market_type in targets:
+        specs.append((base_currency, market_type, False))
+        if hyperliquid:
+            specs.append(('USDT', market_type, True))
+
+    lists = {}
+    for base_currency, market_type, is_hyperliquid in dict.fromkeys(specs):
+        try:
+            streamed = StreamedList(base_currency, market_type, is_hyperliquid, top, exchange_id)
+        except FileNotFoundError as e:
+            print(f"Skipping {e.filename}: not found, fetch it with --get-pairs first")
+            continue
+        lists.setdefault(market_type, []).append(streamed)
+    if not lists:
+        return
+
+    if seed and not replay:
+        for market_type, market_lists in lists.items():
+            scores = ticker_scores(cache.load_tickers(exchange_id, market_type), exchange_id)
+            for streamed in market_lists:
+                streamed.apply(scores)
+                streamed.emit()
+
+    async def run():
+        with open(record, 'a') if record else contextlib.nullcontext() as record_file:
+            async with asyncio.TaskGroup() as group:
+                for market_type, market_lists in lists.items():
+                    feed = replay_feed(replay, market_type, speed) if replay else exchange_feed(exchange_id, market_type)
+                    group.create_task(consume(feed, market_lists, market_type, exchange_id, record_file))
+
+    print(f"Streaming {', '.join(streamed.sorted_file for market_lists in lists.values() for streamed in market_lists)}")
+    asyncio.run(run())
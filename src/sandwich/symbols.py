@@ -0,0 +1,219 @@
+"""
+Compact symbol table shared by the exchange modules.
+
+Pairs are parsed once into Symbol objects holding the base, interned quote,
+market type and exchange, and the canonical coin (see sandwich.aliases). The
+multiplier prefix and TradingView id are derived from them. A table built once per exchange can be
+passed through matching and writing without re-splitting pair strings.
+"""
+
+import sys
+
+from sandwich import aliases
+from sandwich.aliases import split_multiplier
+
+def tradingview_id(exchange, symbol, market_type):
+    """
+    Formats a TradingView id, adding the 'PERP' suffix for perpetual markets.
+
+    Args:
+        exchange (str): The exchange ID (e.g., 'binance').
+        symbol (str): The symbol without separators (e.g., 'BTCUSDT').
+        market_type (str): The market type ('swap' or 'spot').
+
+    Returns:
+        str: The TradingView id (e.g., 'BINANCE:BTCUSDTPERP').
+    """
+    return f"{exchange.upper()}:{symbol}{'PERP' if market_type == 'swap' else ''}"
+
+def tradingview_lines(pairs, exchange, market_type):
+    """
+    Formats pairs as TradingView ids for the given exchange.
+
+    Args:
+        pairs (list or SymbolTable): ccxt symbols (e.g., 'BTC/USDT:USDT') or Symbol objects.
+        exchange (str): The exchange ID used as the TradingView prefix.
+        market_type (str): The market type ('swap' or 'spot').
+
+    Returns:
+        list: The TradingView ids.
+    """
+    prefix = f"{exchange.upper()}:"
+    type_str = 'PERP' if market_type == 'swap' else ''
+    lines = []
+    for pair in pairs:
+        if isinstance(pair, Symbol):
+            lines.append(f"{prefix}{pair.base}{pair.quote}{type_str}")
+        else:
+            lines.append(f"{prefix}{pair.split(':')[0].replace('/', '')}{type_str}")
+    return lines
+
+class Symbol:
+    """
+    A single trading pair on an exchange.
+
+    The exchange, quote and market type strings are interned, so the many
+    symbols of one exchange share a single copy of each.
+
+    Args:
+        exchange (str): The exchange ID (e.g., 'binance').
+        base (str): The base coin as listed, including any multiplier prefix (e.g., '1000PEPE').
+        quote (str): The quote currency (e.g., 'USDT').
+        market_type (str): The market type ('swap' or 'spot').
+        settle (str, optional): The settlement currency for contracts.
+    """
+
+    __slots__ = ('exchange', 'base', 'quote', 'market_type', 'settle', 'coin')
+
+    def __init__(self, exchange, base, quote, market_type, settle=None):
+        self.exchange = sys.intern(exchange.lower())
+        self.base = base
+        self.quote = sys.intern(quote)
+        self.market_type = sys.intern(market_type)
+        self.settle = settle
+        # a dict lookup once the spelling has been seen, this runs once per pair
+        self.coin = aliases.active.canonical(base)
+
+    @classmethod
+    def from_ccxt(cls, exchange, symbol, market_type):
+        """
+        Parses a ccxt symbol such as 'BTC/USDT' or 'BTC/USDT:USDT'.
+
+        Returns:
+            Symbol: The parsed symbol.
+        """
+        pair, _, settle = symbol.partition(':')
+        base, _, quote = pair.partition('/')
+        return cls(exchange, base, quote, market_type, settle or None)
+
+    @classmethod
+    def from_tradingview(cls, line, quote, market_type):
+        """
+        Parses a TradingView line such as 'BINANCE:BTCUSDTPERP'.
+
+        Args:
+            line (str): The TradingView line.
+            quote (str): The quote currency the symbol is expected to end with.
+            market_type (str): The market type ('swap' lines carry a 'PERP' suffix).
+
+        Returns:
+            Symbol: The parsed symbol, or None if the line does not match the quote currency.
+        """
+        exchange, sep, symbol = line.strip().partition(':')
+        if not sep:
+            return None
+        if market_type == 'swap' and symbol.endswith('PERP'):
+            symbol = symbol[:-4]
+        if not symbol.endswith(quote) or len(symbol) == len(quote):
+            return None
+        return cls(exchange, symbol[:-len(quote)], quote, market_type)
+
+    @property
+    def prefix(self):
+        """
+        str: The multiplier prefix (e.g. '1000', 'k' or '').
+        """
+        return split_multiplier(self.base)[0]
+
+    @property
+    def ccxt_symbol(self):
+        """
+        str: The symbol in ccxt format (e.g., 'BTC/USDT:USDT').
+        """
+        symbol = f"{self.base}/{self.quote}"
+        return f"{symbol}:{self.settle}" if self.settle else symbol
+
+    @property
+    def tradingview_id(self):
+        """
+        str: The TradingView id (e.g., 'BINANCE:BTCUSDTPERP').
+        """
+        return tradingview_id(self.exchange, self.base + self.quote, self.market_type)
+
+    def on_exchange(self, exchange):
+        """
+        Returns the same pair listed on another exchange, e.g. to write Binance-formatted lists.
+        """
+        return Symbol(exchange, self.base, self.quote, self.market_type, self.settle)
+
+    def __repr__(self):
+        return f"Symbol({self.tradingview_id!r})"
+
+class SymbolTable:
+    """
+    The symbols of one exchange, built once and passed through matching, sorting and writing.
+
+    Args:
+        exchange (str): The exchange ID.
+        symbols (list): The Symbol objects.
+    """
+
+    __slots__ = ('exchange', 'symbols', '_by_coin')
+
+    def __init__(self, exchange, symbols):
+        self.exchange = exchange.lower()
+        self.symbols = symbols
+        self._by_coin = None
+
+    @classmethod
+    def from_markets(cls, exchange, markets, quote, market_type):
+        """
+        Builds a table from a ccxt market map, keeping active markets of the given quote and type.
+        """
+        symbols = [Symbol.from_ccxt(exchange, symbol, market_type) for symbol, market in markets.items()
+                   if market['active'] and market['quote'] == quote and market.get(market_type, False)]
+        return cls(exchange, symbols)
+
+    @classmethod
+    def from_pairs(cls, exchange, pairs, market_type):
+        """
+        Builds a table from ccxt symbols. Symbol objects are kept, relabelled if they belong to another exchange.
+        """
+        symbols = []
+        for pair in pairs:
+            if not isinstance(pair, Symbol):
+                pair = Symbol.from_ccxt(exchange, pair, market_type)
+            elif pair.exchange != exchange.lower():
+                pair = pair.on_exchange(exchange)
+            symbols.append(pair)
+        return cls(exchange, symbols)
+
+    @classmethod
+    def from_tradingview(cls, lines, quote, market_type, exchange=None):
+        """
+        Builds a table from TradingView lines, skipping lines of other exchanges or quotes.
+        """
+        symbols = []
+        for line in lines:
+            symbol = Symbol.from_tradingview(line, quote, market_type)
+            if symbol is not None and (exchange is None or symbol.exchange == exchange.lower()):
+                symbols.append(symbol)
+        return cls(exchange or (symbols[0].exchange if symbols else ''), symbols)
+
+    @property
+    def by_coin(self):
+        """
+        dict: Normalized coin name to Symbol. When several symbols share a coin, the last one wins.
+        """
+        if self._by_coin is None:
+            self._by_coin = {symbol.coin: symbol for symbol in self.symbols}
+        return self._by_coin
+
+    def ccxt_symbols(self):
+        """
+        Returns the symbols in ccxt format.
+        """
+        return [symbol.ccxt_symbol for symbol in self.symbols]
+
+    def tradingview_lines(self, exchange=None):
+        """
+        Returns the TradingView lines, optionally relabelled for another exchange.
+        """
+        return [symbol.tradingview_id if exchange is None else tradingview_id(exchange, symbol.base + symbol.quote, symbol.market_type)
+                for symbol in self.symbols]
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+    def __len__(self):
+        return len(self.symbols)